@@ -1,9 +1,10 @@
+import sys
 import logging
 import argparse
 
-from PySide6 import QtCore, QtWidgets
+from PySide6 import QtCore
 
-from polarsgraph.main import GRAPH_SETTINGS_KEY, PolarsGraph
+from polarsgraph.graph import GRAPH_SETTINGS_KEY
 from polarsgraph.log import logger
 
 
@@ -28,6 +29,13 @@ example_graph = {
 
 
 if __name__ == '__main__':
+    if sys.argv[1:2] == ['run']:  # headless, see polarsgraph/batch.py
+        from polarsgraph.batch import main
+        sys.exit(main(sys.argv[2:]))
+
+    from PySide6 import QtWidgets
+    from polarsgraph.main import PolarsGraph
+
     parser = argparse.ArgumentParser()
     parser.add_argument('--example', action='store_true', default=False)
     parser.add_argument(
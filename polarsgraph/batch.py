@@ -0,0 +1,166 @@
+"""
+Evaluate a graph without the user interface, e.g. on a server:
+    python -m polarsgraph run graph.pg --node Table1 --out table.parquet
+    python -m polarsgraph run graph.pg --node Pie1 --out pie.png
+
+Tables are written as parquet, csv or xlsx. Displays and dashboards can be
+rendered as images, with an offscreen QApplication.
+"""
+import os
+import logging
+import argparse
+
+import polars as pl
+
+from polarsgraph.log import logger
+from polarsgraph.graph import (
+    DISPLAY_CATEGORY, DASHBOARD_CATEGORY, GRAPH_SETTINGS_KEY, BaseNode, Graph,
+    create_node, build_node_query)
+from polarsgraph.nodetypes import types
+from polarsgraph.serialize import deserialize_graph
+from polarsgraph.nodes.table.tablewidget import get_table_without_color_columns
+
+
+TABLE_EXTENSIONS = 'parquet', 'csv', 'xlsx'
+IMAGE_EXTENSIONS = 'png', 'jpg'
+DEFAULT_IMAGE_SIZE = '1280x720'
+
+
+def load_graph(path) -> Graph:
+    with open(path, 'r') as f:
+        nodes_settings = deserialize_graph(f.read())
+    nodes_settings.pop(GRAPH_SETTINGS_KEY, None)
+    graph = Graph()
+    for name, settings in nodes_settings.items():
+        node_type = settings['type']
+        if node_type not in types:
+            logger.warning(f'Skip "{name}", unknown type "{node_type}"')
+            continue
+        create_node(
+            graph, types, node_type, name, settings, auto_increment=False)
+    return graph
+
+
+def get_errors(graph):
+    return '\n'.join(
+        f'{node["name"]}:\n{node.error}'
+        for node in graph.values() if node.error)
+
+
+def get_table(graph, node_name) -> pl.DataFrame:
+    node: BaseNode = graph[node_name]
+    if node.category == DASHBOARD_CATEGORY:
+        raise ValueError(f'"{node_name}" is a dashboard, export an image')
+    if not build_node_query(graph, node_name):
+        raise RuntimeError(get_errors(graph))
+    if node.category == DISPLAY_CATEGORY:
+        return node.collect(node.display_query, node.cache_context)
+    return node.collect(node.tables[node.outputs[0]], node.cache_context)
+
+
+def write_table(df: pl.DataFrame, path):
+    df = get_table_without_color_columns(df)
+    extension = path.split('.')[-1].lower()
+    if extension == 'parquet':
+        df.write_parquet(path)
+    elif extension == 'csv':
+        df.write_csv(path)
+    elif extension == 'xlsx':
+        df.write_excel(path)
+    else:
+        raise ValueError(f'Extension not covered ({path})')
+
+
+def get_application():
+    # Import Qt widgets only when rendering images
+    from PySide6 import QtWidgets
+    app = QtWidgets.QApplication.instance()
+    if app is None:
+        os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+        app = QtWidgets.QApplication([])
+    return app
+
+
+def wait_for_results(app):
+    from polarsgraph.executor import get_executor
+    executor = get_executor()
+    while executor.jobs:
+        executor.pool.waitForDone(100)
+        app.processEvents()  # deliver results to displays
+
+
+def render_image(graph, node_name, path, size):
+    from polarsgraph.executor import collect_display_node
+    app = get_application()
+    node: BaseNode = graph[node_name]
+    if node.category not in (DISPLAY_CATEGORY, DASHBOARD_CATEGORY):
+        raise ValueError(f'"{node_name}" is not a display')
+    if not build_node_query(graph, node_name):
+        raise RuntimeError(get_errors(graph))
+    widget = node.display_widget
+    if node.category == DASHBOARD_CATEGORY:
+        node.update_board(graph)
+    else:
+        widget.set_board_mode(True)  # hide buttons
+        collect_display_node(graph, node)
+    wait_for_results(app)
+    errors = get_errors(graph)
+    if errors:
+        raise RuntimeError(errors)
+
+    widget.resize(*size)
+    widget.show()
+    app.processEvents()
+    if not widget.grab().save(path):
+        raise OSError(f'Cannot write image "{path}"')
+
+
+def export_node(graph, node_name, path, size):
+    if node_name not in graph:
+        raise KeyError(f'No node "{node_name}" in graph')
+    extension = path.split('.')[-1].lower()
+    if extension in IMAGE_EXTENSIONS:
+        render_image(graph, node_name, path, size)
+    elif extension in TABLE_EXTENSIONS:
+        write_table(get_table(graph, node_name), path)
+    else:
+        raise ValueError(f'Extension not covered ({path})')
+    logger.info(f'"{node_name}" written to {path}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m polarsgraph run',
+        description='Evaluate a graph and export nodes without the UI.')
+    parser.add_argument('graph', help='.pg file')
+    parser.add_argument(
+        '--node', action='append', required=True,
+        help='node to export, can be repeated')
+    parser.add_argument(
+        '--out', action='append', required=True,
+        help='output path of the matching --node: '
+        f'{", ".join(TABLE_EXTENSIONS + IMAGE_EXTENSIONS)}')
+    parser.add_argument(
+        '--size', default=DEFAULT_IMAGE_SIZE,
+        help=f'images size (default: {DEFAULT_IMAGE_SIZE})')
+    parser.add_argument(
+        '--log-level', default='WARNING', type=str.lower,
+        choices=['debug', 'info', 'warning', 'error', 'critical'])
+    args = parser.parse_args(argv)
+    if len(args.node) != len(args.out):
+        parser.error('each --node needs an --out path')
+    try:
+        size = tuple(int(v) for v in args.size.lower().split('x'))
+        assert len(size) == 2
+    except (ValueError, AssertionError):
+        parser.error(f'invalid size "{args.size}", expected WIDTHxHEIGHT')
+    logger.setLevel(getattr(logging, args.log_level.upper()))
+
+    graph = load_graph(args.graph)
+    for node_name, path in zip(args.node, args.out):
+        try:
+            export_node(graph, node_name, path, size)
+        except BaseException as e:
+            logger.error(f'Cannot export "{node_name}": {e}')
+            return 1
+    return 0
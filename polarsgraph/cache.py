@@ -0,0 +1,231 @@
+"""
+Persistent on-disk cache of collected results.
+
+Results are stored as Arrow IPC files, named after a fingerprint of:
+    - the optimized query plan
+    - a context describing what the plan doesn't (upstream nodes settings
+      and path, size and mtime of the source files)
+Least recently used files are evicted when the cache exceeds `MAX_SIZE`.
+
+Source files which are slow to parse (e.g. Excel) are stored the same way
+in `SOURCES_DIR`, named after their path, size, mtime and reader options,
+then memory-mapped. They are not evicted with the results, as Load nodes keep
+scanning them: only previous versions of a source are removed.
+"""
+import os
+import time
+import uuid
+import hashlib
+
+import polars as pl
+
+from polarsgraph.log import logger
+
+
+CACHE_DIR = os.path.expanduser('~/.polarsgraph/cache')
+SOURCES_DIR = os.path.expanduser('~/.polarsgraph/sources')
+EXTENSION = '.arrow'
+MAX_SIZE = 2 * 1024 ** 3  # bytes
+MINIMUM_COLLECT_DURATION = 0.1  # seconds, don't store cheap results
+
+ENABLED = True
+
+
+def get_files_stats(paths):
+    """
+    Return (path, size, mtime) for each file, or None if one is missing.
+    """
+    stats = []
+    for path in sorted(set(paths)):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        stats.append((path, stat.st_size, stat.st_mtime_ns))
+    return stats
+
+
+def get_fingerprint(df: pl.LazyFrame, context: str):
+    try:
+        plan = df.explain(optimized=True)
+    except BaseException:
+        return None
+    fingerprint = hashlib.sha256()
+    for text in (pl.__version__, plan, context):
+        fingerprint.update(text.encode())
+        fingerprint.update(b'\0')
+    return fingerprint.hexdigest()
+
+
+def get_cache_path(fingerprint):
+    return f'{CACHE_DIR}/{fingerprint}{EXTENSION}'
+
+
+def collect(df: pl.LazyFrame, context: str = None) -> pl.DataFrame:
+    """
+    Collect LazyFrame, or read its result from cache.
+    A `None` context means the result can't be cached.
+    """
+    if not ENABLED or context is None:
+        return df.collect()
+    fingerprint = get_fingerprint(df, context)
+    if fingerprint is None:
+        return df.collect()
+
+    cached = read(fingerprint)
+    if cached is not None:
+        return cached
+
+    start = time.perf_counter()
+    result = df.collect()
+    if time.perf_counter() - start >= MINIMUM_COLLECT_DURATION:
+        write(fingerprint, result)
+    return result
+
+
+def collect_all(
+        dfs: list[pl.LazyFrame],
+        contexts: list[str] = None) -> list[pl.DataFrame]:
+    """
+    Collect LazyFrames together, so Polars can share their common subplans.
+    Results found in cache are read instead of being part of the collect.
+    """
+    contexts = contexts or [None] * len(dfs)
+    fingerprints = [
+        get_fingerprint(df, context)
+        if ENABLED and context is not None else None
+        for df, context in zip(dfs, contexts)]
+    results = [read(f) if f else None for f in fingerprints]
+    missing = [i for i, result in enumerate(results) if result is None]
+    if not missing:
+        return results
+
+    start = time.perf_counter()
+    collected = pl.collect_all([dfs[i] for i in missing])
+    store = time.perf_counter() - start >= MINIMUM_COLLECT_DURATION
+    for i, result in zip(missing, collected):
+        results[i] = result
+        if store and fingerprints[i]:
+            write(fingerprints[i], result)
+    return results
+
+
+def get_source_cache_path(path, options: dict):
+    """
+    Path of the parsed source file, or None if it can't be cached.
+    """
+    stats = get_files_stats([path]) if ENABLED else None
+    if stats is None:
+        return None
+    fingerprint = hashlib.sha256()
+    for text in (pl.__version__, repr(stats), repr(sorted(options.items()))):
+        fingerprint.update(text.encode())
+        fingerprint.update(b'\0')
+    # Prefix with the source path and options (e.g. sheet), to find the
+    # previous versions of this table only
+    prefix = hashlib.sha256()
+    for text in (os.path.abspath(path), repr(sorted(options.items()))):
+        prefix.update(text.encode())
+        prefix.update(b'\0')
+    prefix = prefix.hexdigest()[:16]
+    return f'{SOURCES_DIR}/{prefix}-{fingerprint.hexdigest()}{EXTENSION}'
+
+
+def scan_source(path, read_function, options: dict) -> pl.LazyFrame:
+    """
+    Parse the file with `read_function` once, and scan the parsed table from
+    the cache afterwards.
+    """
+    cache_path = get_source_cache_path(path, options)
+    if cache_path is None:
+        return read_function(path, **options).lazy()
+
+    if os.path.exists(cache_path):
+        logger.debug(f'Source read from cache: {cache_path}')
+        return pl.scan_ipc(cache_path, memory_map=True)
+
+    df = read_function(path, **options)
+    write_source(cache_path, df)
+    return df.lazy()
+
+
+def write_source(cache_path, df: pl.DataFrame):
+    temp_path = f'{cache_path}.{uuid.uuid4().hex}.tmp'
+    try:
+        os.makedirs(SOURCES_DIR, exist_ok=True)
+        df.write_ipc(temp_path)
+        os.replace(temp_path, cache_path)
+    except BaseException as e:
+        logger.debug(f'Cannot write source to cache: {e}')
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return
+    # Remove the previous versions of the source, read with same options
+    prefix = os.path.basename(cache_path).split('-')[0]
+    for entry in os.scandir(SOURCES_DIR):
+        if entry.name.startswith(f'{prefix}-') and entry.path != cache_path:
+            try:
+                os.remove(entry.path)
+            except OSError:  # e.g. file still memory mapped on Windows
+                continue
+
+
+def read(fingerprint):
+    path = get_cache_path(fingerprint)
+    if not os.path.exists(path):
+        return None
+    try:
+        result = pl.read_ipc(path)
+        os.utime(path)  # mark as recently used
+    except BaseException as e:
+        logger.debug(f'Cannot read cached result "{path}": {e}')
+        return None
+    logger.debug(f'Result read from cache: {path}')
+    return result
+
+
+def write(fingerprint, df: pl.DataFrame):
+    path = get_cache_path(fingerprint)
+    temp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        df.write_ipc(temp_path)
+        os.replace(temp_path, path)
+    except BaseException as e:
+        # e.g. Object columns cannot be serialized
+        logger.debug(f'Cannot write result to cache: {e}')
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return
+    evict()
+
+
+def evict(max_size=None):
+    """
+    Remove least recently used results until cache is under max size.
+    """
+    max_size = MAX_SIZE if max_size is None else max_size
+    try:
+        entries = [e for e in os.scandir(CACHE_DIR) if e.is_file()]
+    except OSError:
+        return
+    files = []
+    for entry in entries:
+        try:
+            stat = entry.stat()
+        except OSError:
+            continue
+        files.append((stat.st_mtime, stat.st_size, entry.path))
+    total_size = sum(f[1] for f in files)
+    for _, size, path in sorted(files):
+        if total_size <= max_size:
+            break
+        try:
+            os.remove(path)
+        except OSError:  # e.g. file still memory mapped on Windows
+            continue
+        total_size -= size
+
+
+def clear():
+    evict(max_size=0)
@@ -2,6 +2,7 @@ from PySide6 import QtWidgets, QtCore
 
 from polarsgraph.graph import (
     DISPLAY_CATEGORY, DASHBOARD_CATEGORY, build_node_query)
+from polarsgraph.executor import collect_display_node, cancel_display_node
 from polarsgraph.nodes.base import DISPLAY_INDEX_ATTR, BaseNode
 
 
@@ -59,7 +60,10 @@ class DisplayWidget(QtWidgets.QWidget):
             # Now, update layout & visible widgets:
             self.node.update_board(self.graph)
         elif not success:
+            cancel_display_node(self.node)
             self.node.clear()
+        else:
+            collect_display_node(self.graph, self.node)
 
     def set_display_node(self, node_name: str):
         # Update settings
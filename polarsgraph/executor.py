@@ -0,0 +1,228 @@
+"""
+Collect display nodes queries in a thread pool, away from the GUI thread.
+
+Jobs are identified by a key (the display node name, or the dashboard name
+for batches): submitting a new job with the same key cancels the previous one
+if it didn't start yet, or drops its result when it finishes.
+"""
+import time
+import traceback
+from functools import partial
+
+from PySide6 import QtCore
+
+from polarsgraph import cache, profiler
+from polarsgraph.log import logger
+from polarsgraph.graph import get_error_node
+
+
+class JobSignals(QtCore.QObject):
+    finished = QtCore.Signal(str, int, object, object)
+
+
+class QueryJob(QtCore.QRunnable):
+    def __init__(self, key, generation, function, signals):
+        super().__init__()
+        self.setAutoDelete(False)  # Python owns it, needed for tryTake()
+        self.key = key
+        self.generation = generation
+        self.function = function
+        self.signals = signals
+
+    def run(self):
+        try:
+            result, error = self.function(), None
+        except BaseException:
+            result, error = None, traceback.format_exc()
+        self.signals.finished.emit(self.key, self.generation, result, error)
+
+
+class QueryExecutor(QtCore.QObject):
+    done = QtCore.Signal(str)
+    failed = QtCore.Signal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+
+        self.pool = QtCore.QThreadPool(self)
+        self.signals = JobSignals(self)
+        self.signals.finished.connect(self._finish)
+
+        self.generations: dict[str, int] = {}
+        self.jobs: dict[str, QueryJob] = {}
+        self.callbacks: dict[str, tuple] = {}
+
+    def submit(self, key, function, callback, error_callback=None):
+        self.cancel(key)
+        generation = self.generations[key]
+        job = QueryJob(key, generation, function, self.signals)
+        self.jobs[key] = job
+        self.callbacks[key] = callback, error_callback
+        self.pool.start(job)
+
+    def cancel(self, key):
+        """
+        Remove job from queue if not started yet, otherwise ignore its result
+        """
+        job = self.jobs.pop(key, None)
+        if job is not None:
+            self.pool.tryTake(job)
+        self.callbacks.pop(key, None)
+        self.generations[key] = self.generations.get(key, 0) + 1
+
+    def is_running(self, key):
+        return key in self.jobs
+
+    def _finish(self, key, generation, result, error):
+        if generation != self.generations.get(key):
+            logger.debug(f'Dropped outdated result for "{key}"')
+            return
+        self.jobs.pop(key, None)
+        callback, error_callback = self.callbacks.pop(key)
+        if error is None:
+            callback(result)
+            self.done.emit(key)
+            return
+        log_error(key, error)
+        if error_callback:
+            error_callback(error)
+        self.failed.emit(key)
+        self.done.emit(key)
+
+
+def log_error(key, error):
+    prefix = f'    [collect error "{key}"] '
+    logger.warning(prefix + f'\n{prefix}'.join(error.split('\n')))
+
+
+_executor: QueryExecutor = None
+# Nodes & queries of running batches: {key: {node name: (node, query)}}
+_batches: dict[str, dict] = {}
+
+
+def get_executor() -> QueryExecutor:
+    global _executor
+    if _executor is None:
+        _executor = QueryExecutor()
+    return _executor
+
+
+def collect_display_node(graph, node):
+    """
+    Collect pending query of a display node in the background, then send
+    the result to the node.
+    """
+    query = node.display_query
+    if query is None:
+        return  # already displayed
+    node.display_query = None
+    node.display_widget.set_busy(True)
+    get_executor().submit(
+        node['name'],
+        partial(node.fetch, query, node.cache_context),
+        partial(_set_node_result, node),
+        partial(_set_node_error, graph, node))
+
+
+def cancel_display_node(node):
+    get_executor().cancel(node['name'])
+    node.display_widget.set_busy(False)
+
+
+def _set_node_result(node, result):
+    node.display_widget.set_busy(False)
+    node.set_result(result)
+
+
+def _set_node_error(graph, node, error):
+    node.display_widget.set_busy(False)
+    node.clear()
+    get_error_node(graph, node).error = error
+
+
+def collect_display_nodes(graph, key, nodes):
+    """
+    Collect pending queries of several display nodes in a single background
+    job, with `pl.collect_all` so Polars can share their common subplans.
+    Queries of a previous batch still running are collected again with the
+    new ones.
+    """
+    names = [node['name'] for node in nodes]
+    previous_batch = _batches.get(key, {})
+    batch = {n: previous_batch[n] for n in names if n in previous_batch}
+    pending = [node for node in nodes if node.display_query is not None]
+    if not pending and len(batch) == len(previous_batch):
+        return  # nothing new
+    executor = get_executor()
+    for node in pending:
+        executor.cancel(node['name'])
+        batch[node['name']] = node, node.display_query
+        node.display_query = None
+        node.display_widget.set_busy(True)
+    if not batch:
+        return cancel_display_nodes(key)
+
+    _batches[key] = batch
+    items = list(batch.values())
+    queries = [query for _, query in items]
+    contexts = [node.cache_context for node, _ in items]
+    executor.submit(
+        key,
+        partial(_collect_batch, key, items, queries, contexts),
+        partial(_set_batch_results, graph, key, items),
+        partial(_set_batch_error, key, items))
+
+
+def cancel_display_nodes(key):
+    get_executor().cancel(key)
+    for node, _ in _batches.pop(key, {}).values():
+        node.display_widget.set_busy(False)
+
+
+def _collect_batch(key, items, queries, contexts):
+    start = time.perf_counter()
+    try:
+        fetch_queries = [
+            node.get_fetch_query(query)
+            for (node, _), query in zip(items, queries)]
+        collected = [i for i, q in enumerate(fetch_queries) if q is not None]
+        results = cache.collect_all(
+            [fetch_queries[i] for i in collected],
+            [contexts[i] for i in collected])
+    except BaseException:
+        # fetch one by one to know which queries fail
+        collected, results = [], []
+    duration = time.perf_counter() - start
+    fetched = dict(zip(collected, results))
+    for i, result in fetched.items():
+        profiler.record_collect(items[i][0]['name'], duration, result, key)
+
+    # Nodes fetching on their own (paged tables) or failing in the batch
+    results = []
+    for i, ((node, _), query, context) in enumerate(
+            zip(items, queries, contexts)):
+        if i in fetched:
+            results.append((fetched[i], None))
+            continue
+        try:
+            results.append((node.fetch(query, context), None))
+        except BaseException:
+            results.append((None, traceback.format_exc()))
+    return results
+
+
+def _set_batch_results(graph, key, items, results):
+    _batches.pop(key, None)
+    for (node, _), (result, error) in zip(items, results):
+        if error is None:
+            _set_node_result(node, result)
+            continue
+        log_error(node['name'], error)
+        _set_node_error(graph, node, error)
+        get_executor().failed.emit(node['name'])
+
+
+def _set_batch_error(key, items, error):
+    _batches.pop(key, None)
+    for node, _ in items:
+        node.display_widget.set_busy(False)
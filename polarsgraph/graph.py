@@ -1,10 +1,14 @@
+import os
 import re
+import time
 import traceback
-from collections import defaultdict
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
 
 import polars as pl
 from PySide6 import QtCore, QtGui
 
+from polarsgraph import cache, profiler
 from polarsgraph.log import logger
 from polarsgraph.serialize import serialize_node
 
@@ -15,8 +19,22 @@ LOAD_CATEGORY = 'load'
 DASHBOARD_CATEGORY = 'dashboard'
 BACKDROP_CATEGORY = 'backdrop'
 
+# Settings which don't affect the node result
+LAYOUT_ATTRIBUTES = 'position', 'color'
+
 DYNAMIC_PLUG_COUNT = 'dynamic'
 
+# Key of the dummy node storing the view settings in saved graphs
+GRAPH_SETTINGS_KEY = '_graph_settings'
+
+# Preview mode: load nodes only output their first rows
+DEFAULT_PREVIEW_ROWS = 10_000
+_preview_rows: int = None
+
+# Independent nodes (e.g. Load nodes reading files) are built concurrently
+BUILD_THREADS = min(8, os.cpu_count() or 1)
+_build_pool: ThreadPoolExecutor = None
+
 CATEGORY_INPUT_TYPE = {
     LOAD_CATEGORY: None,
     MANIPULATE_CATEGORY: 'table',
@@ -46,6 +64,8 @@ class BaseNode:
 
         self.dirty = True
         self.tables: dict[str, pl.LazyFrame] = {}
+        self.cache_context: str = None
+        self.preview = False  # built from the first rows of the sources
 
         # Graph settings
         if not self.settings.get('position'):
@@ -76,10 +96,18 @@ class BaseNode:
             return
         try:
             logger.debug(f'Building query for "{self["name"]}"')
+            start = time.perf_counter()
             if self['disabled']:
                 self.tables['table'] = tables[0]
             else:
                 self._build_query(tables)
+            if self.category == LOAD_CATEGORY:
+                self.preview = bool(_preview_rows)
+                if self.preview:  # pushed down to the scans readers
+                    self.tables = {
+                        name: table.head(_preview_rows)
+                        for name, table in self.tables.items()}
+            profiler.record_build(self['name'], time.perf_counter() - start)
             self.dirty = False
             return None
         except BaseException:
@@ -88,6 +116,43 @@ class BaseNode:
             logger.warning(prefix + f'\n{prefix}'.join(error.split('\n')))
             return error
 
+    def collect(self, df: pl.LazyFrame, context: str) -> pl.DataFrame:
+        """
+        Use this rather than `df.collect()` so results can be cached and
+        profiled. `context` is the `cache_context` of the node when `df` was
+        built: pass it along with the query, the node can be rebuilt before
+        the collect runs.
+        """
+        start = time.perf_counter()
+        result = cache.collect(df, context)
+        profiler.record_collect(
+            self['name'], time.perf_counter() - start, result)
+        return result
+
+    def get_fetch_query(self, df: pl.LazyFrame) -> pl.LazyFrame | None:
+        """
+        Query of what the display shows, collected alone by `fetch` or with
+        the other displays of a dashboard. Displays can override this to
+        fetch only what they show.
+        Return None if the result isn't a collect of a single query (e.g.
+        paged tables): dashboards then call `fetch`, which must be
+        overridden too.
+        """
+        return df
+
+    def fetch(self, df: pl.LazyFrame, context: str):
+        """
+        Get the result to display.
+        """
+        return self.collect(self.get_fetch_query(df), context)
+
+    def get_source_paths(self):
+        """
+        Files read by the node. Load nodes reading something else than files
+        (e.g. a database) return None: their results can't be cached.
+        """
+        return None if self.category == LOAD_CATEGORY else []
+
     def serialize(self):
         return serialize_node(self.settings)
 
@@ -141,40 +206,197 @@ def get_upstream_node_names(graph, node_name):
     return names
 
 
+class GraphIndex:
+    """
+    Connections of the graph nodes in both directions, and a topological
+    order of the nodes computed once per change of connections.
+    Call `update_node()` after changing the inputs of a node.
+    """
+    def __init__(self, graph):
+        self.graph = graph
+        self.upstreams: dict[str, list[str]] = {}
+        # Count connections, as a node can use the same input twice
+        self.downstreams: dict[str, dict[str, int]] = defaultdict(dict)
+        self._order: dict[str, int] = None
+        for node_name in graph:
+            self.update_node(node_name)
+
+    def update_node(self, node_name):
+        if node_name in self.graph:
+            inputs = self.graph[node_name]['inputs'] or []
+            upstream_names = [plug[0] for plug in inputs if plug]
+        else:  # deleted node
+            upstream_names = None
+        old_upstream_names = self.upstreams.get(node_name)
+        if upstream_names == old_upstream_names:
+            return
+
+        for upstream_name in old_upstream_names or []:
+            downstreams = self.downstreams[upstream_name]
+            downstreams[node_name] -= 1
+            if not downstreams[node_name]:
+                del downstreams[node_name]
+        if upstream_names is None:
+            del self.upstreams[node_name]
+        else:
+            self.upstreams[node_name] = upstream_names
+            for upstream_name in upstream_names:
+                downstreams = self.downstreams[upstream_name]
+                downstreams[node_name] = downstreams.get(node_name, 0) + 1
+        self._order = None
+
+    def get_upstream_node_names(self, node_name):
+        return self.upstreams.get(node_name, [])
+
+    def get_downstream_node_names(self, node_name):
+        return list(self.downstreams.get(node_name, ()))
+
+    @property
+    def order(self) -> dict[str, int]:
+        """
+        Position of each node in a topological order (Kahn's algorithm).
+        Nodes part of a cycle are missing.
+        """
+        if self._order is not None:
+            return self._order
+        upstream_counts = {
+            name: len(set(names)) for name, names in self.upstreams.items()}
+        for names in self.upstreams.values():
+            for name in names:
+                upstream_counts.setdefault(name, 0)
+        to_parse = deque(
+            name for name, count in upstream_counts.items() if not count)
+        self._order = {}
+        while to_parse:
+            node_name = to_parse.popleft()
+            self._order[node_name] = len(self._order)
+            for downstream_name in self.downstreams.get(node_name, ()):
+                upstream_counts[downstream_name] -= 1
+                if not upstream_counts[downstream_name]:
+                    to_parse.append(downstream_name)
+        return self._order
+
+
+class Graph(dict):
+    """
+    Nodes by name, indexed by their connections.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.index = GraphIndex(self)
+
+    def __setitem__(self, node_name, node):
+        super().__setitem__(node_name, node)
+        self.index.update_node(node_name)
+
+    def __delitem__(self, node_name):
+        super().__delitem__(node_name)
+        self.index.update_node(node_name)
+
+    def pop(self, node_name, *default):
+        node = super().pop(node_name, *default)
+        self.index.update_node(node_name)
+        return node
+
+
+def get_index(graph) -> GraphIndex:
+    if isinstance(graph, Graph):
+        return graph.index
+    return GraphIndex(graph)  # plain dict, e.g. a selection
+
+
 def get_all_upstream_node_names(graph, initial_node_name):
     """
     Return nodes in an order they can be computed (with their inputs computed).
     """
-    upstream_names = []
+    index = get_index(graph)
+    upstream_names = set()
     to_parse = [initial_node_name]
     while to_parse:
         node_name = to_parse.pop()
-        upstream_nodes = get_upstream_node_names(graph, node_name)
-        to_parse.extend(upstream_nodes)
-        for node_name in upstream_nodes:
-            if node_name in upstream_names:
-                # position needs to be updated
-                upstream_names.remove(node_name)
-            upstream_names.append(node_name)
-    return upstream_names
+        for upstream_name in index.get_upstream_node_names(node_name):
+            if upstream_name == initial_node_name:
+                raise ValueError(f'Cyclic graph around {upstream_name}')
+            if upstream_name not in upstream_names:
+                upstream_names.add(upstream_name)
+                to_parse.append(upstream_name)
+    order = index.order
+    try:
+        return sorted(upstream_names, key=order.__getitem__, reverse=True)
+    except KeyError as e:
+        raise ValueError(f'Cyclic graph around {e.args[0]}') from None
 
 
 def get_all_nodes_output_nodes(graph):
-    downstreams = defaultdict(list)
-    for node_name in graph:
-        for upstream_name in get_upstream_node_names(graph, node_name):
-            downstreams[upstream_name].append(node_name)
-    return downstreams
+    index = get_index(graph)
+    return defaultdict(list, {
+        node_name: index.get_downstream_node_names(node_name)
+        for node_name in graph})
 
 
 def get_downstream_node_names(graph, initial_node_name):
-    return get_all_nodes_output_nodes(graph)[initial_node_name]
+    return get_index(graph).get_downstream_node_names(initial_node_name)
 
 
 def set_dirty_recursive(graph: dict, node_name: str):
-    graph[node_name].dirty = True
-    for node_name in get_downstream_node_names(graph, node_name):
-        set_dirty_recursive(graph, node_name)
+    index = get_index(graph)
+    dirtied = set()
+    to_parse = [node_name]
+    while to_parse:
+        node_name = to_parse.pop()
+        if node_name in dirtied:
+            continue
+        dirtied.add(node_name)
+        graph[node_name].dirty = True
+        to_parse.extend(index.get_downstream_node_names(node_name))
+
+
+def get_preview_rows():
+    return _preview_rows
+
+
+def set_preview_rows(rows: int | None):
+    """
+    Enable preview mode with a number of rows, disable it with None.
+    Load nodes need to be rebuilt (see `set_load_nodes_dirty`).
+    """
+    global _preview_rows
+    _preview_rows = rows
+
+
+def set_load_nodes_dirty(graph):
+    for node in list(graph.values()):
+        if node.category == LOAD_CATEGORY:
+            set_dirty_recursive(graph, node['name'])
+
+
+def is_preview(graph, node_name):
+    return any(
+        graph[name].preview
+        for name in get_all_upstream_node_names(graph, node_name))
+
+
+def get_cache_context(graph, node_name):
+    """
+    Describe what the result of a node depends on, beside its query plan:
+    the upstream nodes settings and the files they read.
+    Return None if it can't be described (result must not be cached).
+    """
+    settings = []
+    paths = []
+    for upstream_node_name in sorted(
+            get_all_upstream_node_names(graph, node_name)):
+        upstream_node: BaseNode = graph[upstream_node_name]
+        settings.append(serialize_node(
+            upstream_node.settings, ignore_attributes=LAYOUT_ATTRIBUTES))
+        source_paths = upstream_node.get_source_paths()
+        if source_paths is None:
+            return None
+        paths.extend(source_paths)
+    files_stats = cache.get_files_stats(paths)
+    if files_stats is None:
+        return None
+    return '\n'.join([*settings, repr(files_stats)])
 
 
 def _get_input_table(graph, node_name, input_plug_index=0):
@@ -202,6 +424,61 @@ def get_input_tables(graph, node):
     return input_tables
 
 
+def get_build_levels(graph, node_names):
+    """
+    Group dirty nodes by dependency level: nodes of a level only depend on
+    nodes of the previous levels, so they can be built concurrently.
+    `node_names` must be in the order they can be computed.
+    """
+    index = get_index(graph)
+    levels = {}
+    for node_name in node_names:
+        if not graph[node_name].dirty:
+            continue
+        levels[node_name] = max((
+            levels[upstream_name] + 1
+            for upstream_name in index.get_upstream_node_names(node_name)
+            if upstream_name in levels), default=0)
+    nodes_by_level = defaultdict(list)
+    for node_name, level in levels.items():
+        nodes_by_level[level].append(graph[node_name])
+    return [nodes_by_level[level] for level in sorted(nodes_by_level)]
+
+
+def get_build_pool():
+    global _build_pool
+    if _build_pool is None:
+        _build_pool = ThreadPoolExecutor(
+            BUILD_THREADS, thread_name_prefix='build')
+    return _build_pool
+
+
+def _build_nodes(graph, nodes: list[BaseNode]):
+    """
+    Build independent nodes, concurrently when there are several tables to
+    build. Displays are built in the calling thread as they own widgets.
+    Return the errors, in the nodes order.
+    """
+    concurrent_nodes = [
+        node for node in nodes
+        if node.category in (LOAD_CATEGORY, MANIPULATE_CATEGORY)]
+    futures = {}
+    if len(concurrent_nodes) > 1:
+        pool = get_build_pool()
+        futures = {
+            node['name']: pool.submit(
+                node.build_query, get_input_tables(graph, node))
+            for node in concurrent_nodes}
+    errors = []
+    for node in nodes:
+        future = futures.get(node['name'])
+        if future:
+            errors.append(future.result())
+        else:
+            errors.append(node.build_query(get_input_tables(graph, node)))
+    return errors
+
+
 def build_node_query(graph: dict, node_name: str):
     """
     Build the LazyFrame query
@@ -212,30 +489,35 @@ def build_node_query(graph: dict, node_name: str):
         return True
     nodes_to_build = [
         node_name, *get_all_upstream_node_names(graph, node_name)]
-    for upstream_node_name in reversed(nodes_to_build):
-        upstream_node: BaseNode = graph[upstream_node_name]
-        if upstream_node.dirty:
+    for level_nodes in get_build_levels(graph, reversed(nodes_to_build)):
+        for upstream_node in level_nodes:
             upstream_node.error = None
-            error = upstream_node.build_query(
-                get_input_tables(graph, upstream_node))
+            if upstream_node.category == DISPLAY_CATEGORY:
+                upstream_node.cache_context = get_cache_context(
+                    graph, upstream_node['name'])
+                upstream_node.preview = is_preview(
+                    graph, upstream_node['name'])
+        errors = _build_nodes(graph, level_nodes)
+        for upstream_node, error in zip(level_nodes, errors):
             if error:
-                error_node = None
-                if upstream_node.category == DISPLAY_CATEGORY:
-                    input_nodes = get_input_nodes(
-                        graph, upstream_node['name'])
-                    if not input_nodes:
-                        upstream_node.error = error
-                        return False
-                    error_node = input_nodes[0]
-                else:
-                    error_node = upstream_node
-                if error_node:
-                    error_node.error = error
-                logger.debug(f'Build aborted because of {upstream_node_name}')
+                get_error_node(graph, upstream_node).error = error
+                logger.debug(
+                    f'Build aborted because of {upstream_node["name"]}')
                 return False
     return True
 
 
+def get_error_node(graph, node):
+    """
+    Errors of displays are most likely caused by their input table: report
+    them on the input node.
+    """
+    if node.category != DISPLAY_CATEGORY:
+        return node
+    input_nodes = get_input_nodes(graph, node['name'])
+    return input_nodes[0] if input_nodes else node
+
+
 def connect_nodes(graph, source_node, source_index, target_node, target_index):
     # Check plugs compatibility
     if source_node == target_node:
@@ -268,6 +550,7 @@ def connect_nodes(graph, source_node, source_index, target_node, target_index):
         except IndexError:
             target_node['inputs'].append(None)
     target_node['inputs'][target_index] = [source_node['name'], source_index]
+    get_index(graph).update_node(target_name)
     return True
 
 
@@ -287,7 +570,7 @@ def remove_unused_dynamic_plugs(node):
     node['inputs'] = node['inputs'][:-to_disconnect]
 
 
-def disconnect_plug(node, index):
+def disconnect_plug(graph, node, index):
     try:
         if not node['inputs'][index]:
             return
@@ -296,6 +579,7 @@ def disconnect_plug(node, index):
     node['inputs'][index] = None
     if node.inputs == DYNAMIC_PLUG_COUNT:
         remove_unused_dynamic_plugs(node)
+    get_index(graph).update_node(node['name'])
 
 
 def _increment_string(s):
@@ -313,19 +597,23 @@ def rename_node(graph, old_name, new_name):
     while new_name in graph:
         new_name = _increment_string(new_name)
 
+    index = get_index(graph)
+    downstream_names = index.get_downstream_node_names(old_name)
+
     # Rename node
     node = graph.pop(old_name)
     node['name'] = new_name
     graph[new_name] = node
 
     # Rename plugs
-    for node in graph.values():
-        for input in node['inputs'] or []:
+    for downstream_name in downstream_names:
+        for input in graph[downstream_name]['inputs'] or []:
             if not input:
                 continue
             plug_node_name = input[0]
             if plug_node_name == old_name:
                 input[0] = new_name
+        index.update_node(downstream_name)
 
     return new_name
 
@@ -1,93 +1,38 @@
 import os
 import uuid
 import json
+import hashlib
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime as Datetime
 from functools import partial
 
-from PySide6 import QtWidgets, QtGui
+from PySide6 import QtWidgets, QtGui, QtCore
 from PySide6.QtCore import Qt
 
+from polarsgraph import cache, profiler
 from polarsgraph.log import logger
 from polarsgraph.graph import (
-    DISPLAY_CATEGORY, DASHBOARD_CATEGORY,
+    DISPLAY_CATEGORY, DASHBOARD_CATEGORY, GRAPH_SETTINGS_KEY, LOAD_CATEGORY,
+    LAYOUT_ATTRIBUTES,
     create_node, build_node_query, connect_nodes, rename_node,
-    set_dirty_recursive, disconnect_plug, get_input_tables)
-from polarsgraph.undo import UndoStack
+    set_dirty_recursive, disconnect_plug, get_input_tables, Graph,
+    DEFAULT_PREVIEW_ROWS, get_preview_rows, set_preview_rows,
+    set_load_nodes_dirty)
+from polarsgraph.undo import UndoStack, get_changes
+from polarsgraph.executor import get_executor
+from polarsgraph.watcher import SourcesWatcher
 from polarsgraph.qtutils import set_shortcut
-from polarsgraph.serialize import serialize_graph, deserialize_graph
+from polarsgraph.serialize import (
+    serialize_graph, deserialize_graph, deserialize_node,
+    join_serialized_nodes)
 
 from polarsgraph.nodes.base import BaseNode
 from polarsgraph.nodeview import NodeView, IN, OUT
+from polarsgraph.plan import get_node_table
 from polarsgraph.panel import SettingsWidget
 from polarsgraph.display import DisplayWidget, get_displays_by_index
-
-from polarsgraph.nodes.dot import DotNode, DotSettingsWidget
-from polarsgraph.nodes.load import LoadNode, LoadSettingsWidget
-from polarsgraph.nodes.sort import SortNode, SortSettingsWidget
-from polarsgraph.nodes.join import JoinNode, JoinSettingsWidget
-from polarsgraph.nodes.group import GroupNode, GroupSettingsWidget
-from polarsgraph.nodes.pivot import PivotNode, PivotSettingsWidget
-from polarsgraph.nodes.derive import DeriveNode, DeriveSettingsWidget
-from polarsgraph.nodes.filter import FilterNode, FilterSettingsWidget
-from polarsgraph.nodes.format import FormatNode, FormatSettingsWidget
-from polarsgraph.nodes.rename import RenameNode, RenameSettingsWidget
-from polarsgraph.nodes.switch import SwitchNode, SwitchSettingsWidget
-from polarsgraph.nodes.reorder import ReorderNode, ReorderSettingsWidget
-from polarsgraph.nodes.backdrop import BackdropNode, BackdropSettingsWidget
-from polarsgraph.nodes.constant import (
-    ConstantNode, ConstantSettingsWidget)
-from polarsgraph.nodes.sql import SQLNode, SqlSettingsWidget
-from polarsgraph.nodes.concatenate import (
-    ConcatenateNode, ConcatenateSettingsWidget)
-
-from polarsgraph.nodes.table import (
-    TableNode, TableSettingsWidget)
-from polarsgraph.nodes.bars import (
-    BarsNode, BarsSettingsWidget)
-from polarsgraph.nodes.pie import (
-    PieNode, PieSettingsWidget)
-from polarsgraph.nodes.lines import (
-    LinesNode, LinesSettingsWidget)
-from polarsgraph.nodes.label import (
-    LabelNode, LabelSettingsWidget)
-from polarsgraph.nodes.dashboard import (
-    DashboardNode, DashboardSettingsWidget)
-
-
-types = {
-    LoadNode.type: {'type': LoadNode, 'widget': LoadSettingsWidget},
-    # Manipulators
-    SortNode.type: {'type': SortNode, 'widget': SortSettingsWidget},
-    JoinNode.type: {'type': JoinNode, 'widget': JoinSettingsWidget},
-    PivotNode.type: {'type': PivotNode, 'widget': PivotSettingsWidget},
-    GroupNode.type: {'type': GroupNode, 'widget': GroupSettingsWidget},
-    DeriveNode.type: {'type': DeriveNode, 'widget': DeriveSettingsWidget},
-    FilterNode.type: {'type': FilterNode, 'widget': FilterSettingsWidget},
-    FormatNode.type: {'type': FormatNode, 'widget': FormatSettingsWidget},
-    RenameNode.type: {'type': RenameNode, 'widget': RenameSettingsWidget},
-    ReorderNode.type: {'type': ReorderNode, 'widget': ReorderSettingsWidget},
-    SwitchNode.type: {'type': SwitchNode, 'widget': SwitchSettingsWidget},
-    ConcatenateNode.type: {
-        'type': ConcatenateNode, 'widget': ConcatenateSettingsWidget},
-    ConstantNode.type: {
-        'type': ConstantNode, 'widget': ConstantSettingsWidget},
-    SQLNode.type: {'type': SQLNode, 'widget': SqlSettingsWidget},
-    # Displays
-    PieNode.type: {'type': PieNode, 'widget': PieSettingsWidget},
-    BarsNode.type: {'type': BarsNode, 'widget': BarsSettingsWidget},
-    LabelNode.type: {'type': LabelNode, 'widget': LabelSettingsWidget},
-    LinesNode.type: {'type': LinesNode, 'widget': LinesSettingsWidget},
-    TableNode.type: {'type': TableNode, 'widget': TableSettingsWidget},
-    # Dashboard
-    DashboardNode.type: {
-        'type': DashboardNode, 'widget': DashboardSettingsWidget},
-    # Backdrop
-    BackdropNode.type: {
-        'type': BackdropNode, 'widget': BackdropSettingsWidget},
-    # Dot
-    DotNode.type: {'type': DotNode, 'widget': DotSettingsWidget},
-}
+from polarsgraph.nodetypes import types
 
 
 LOCAL_DIR = os.path.expanduser('~/.polarsgraph')
@@ -95,8 +40,8 @@ os.makedirs(LOCAL_DIR, exist_ok=True)
 DEFAULT_AUTOSAVE_PATH = f'{LOCAL_DIR}/.autosave.pg'
 PREFS_PATH = f'{LOCAL_DIR}/.prefs'
 RECENTS_PREF = 'recents'
+AUTOSAVE_DELAY = 500  # ms, successive changes are saved once
 
-GRAPH_SETTINGS_KEY = '_graph_settings'
 TITLE = 'PolarsGraph'
 CLIPBOARD_PREFIX = '# PolarsGraph clipboard\n'
 
@@ -111,11 +56,22 @@ class PolarsGraph(QtWidgets.QMainWindow):
         if extra_types:
             types.update(extra_types)
 
-        self.graph = dict()
+        self.graph = Graph()
         self.undo_stack = UndoStack()
         self._save_path = None
         self.autosave_path = DEFAULT_AUTOSAVE_PATH
 
+        # Autosave is delayed, and written in order by a single thread
+        self._autosave_timer = QtCore.QTimer(self)
+        self._autosave_timer.setSingleShot(True)
+        self._autosave_timer.setInterval(AUTOSAVE_DELAY)
+        self._autosave_timer.timeout.connect(self.flush_autosave)
+        self._autosave_pending = False
+        self._autosave_record_undo = False
+        self._autosave_last = None, None  # path, content hash
+        self._autosave_writer = ThreadPoolExecutor(1, 'autosave')
+        self._autosave_future = None
+
         self.shortcuts_list = []
 
         self.setMinimumWidth(1000)
@@ -127,6 +83,10 @@ class PolarsGraph(QtWidgets.QMainWindow):
         self.node_view = NodeView(types, self.graph, zoom, origin)
         self.settings_widget = SettingsWidget(types)
 
+        self.sources_watcher = SourcesWatcher(self)
+        self.sources_watcher.set_graph(self.graph)
+        self.sources_watcher.sources_changed.connect(self.refresh_sources)
+
         toolbar = QtWidgets.QWidget()
         size = 24
         toolbar.setMaximumHeight(size)
@@ -161,10 +121,13 @@ class PolarsGraph(QtWidgets.QMainWindow):
             self.settings_widget.show_error)
         self.node_view.insert_node_requested.connect(self.insert_node)
 
+        get_executor().done.connect(self.node_view.update)
+
         self.settings_widget.settings_changed.connect(self.set_dirty_recursive)
         self.settings_widget.settings_changed.connect(self.node_view.update)
         self.settings_widget.settings_changed.connect(self.build_node_query)
         self.settings_widget.rename_asked.connect(self.rename_node)
+        self.settings_widget.plan_asked.connect(self.show_plan)
 
         self.settings_widget.settings_changed.connect(self.autosave)
 
@@ -207,6 +170,8 @@ class PolarsGraph(QtWidgets.QMainWindow):
         menubar.addMenu(file_menu)
         edit_menu = QtWidgets.QMenu('Edit', self)
         menubar.addMenu(edit_menu)
+        profile_menu = QtWidgets.QMenu('Profile', self)
+        menubar.addMenu(profile_menu)
         help_menu = QtWidgets.QMenu('Help', self)
         menubar.addMenu(help_menu)
 
@@ -238,6 +203,26 @@ class PolarsGraph(QtWidgets.QMainWindow):
             (edit_menu, None, None, '-------'),
             (edit_menu, 'Undo', self.undo, 'ctrl+z'),
             (edit_menu, 'Redo', self.redo, 'ctrl+y'),
+            (edit_menu, None, None, '-------'),
+            (edit_menu, 'Clear results cache', cache.clear, None),
+            (edit_menu, None, None, '-------'),
+            (
+                edit_menu,
+                f'Toggle preview ({DEFAULT_PREVIEW_ROWS} first rows)',
+                self.toggle_preview,
+                'ctrl+p'),
+            (edit_menu, 'Run full', self.run_full, 'ctrl+shift+p'),
+            (
+                profile_menu,
+                'Toggle nodes timings',
+                self.toggle_profiles,
+                'ctrl+t'),
+            (
+                profile_menu,
+                'Export timings...',
+                self.prompt_export_profiles,
+                None),
+            (profile_menu, 'Clear timings', self.clear_profiles, None),
             (help_menu, 'Shortcuts', self.show_shortcuts, None),
         )
         for menu, label, func, shortcut_key in menu_cfg:
@@ -314,7 +299,7 @@ class PolarsGraph(QtWidgets.QMainWindow):
         # Load graph
         if graph:
             self.load_graph(graph)
-            self.add_undo()
+            self.flush_autosave()
 
     @property
     def save_path(self):
@@ -323,7 +308,13 @@ class PolarsGraph(QtWidgets.QMainWindow):
     @save_path.setter
     def save_path(self, path):
         self._save_path = path
-        self.setWindowTitle(f'{TITLE} - {path}')
+        self.update_title()
+
+    def update_title(self):
+        title = f'{TITLE} - {self._save_path}' if self._save_path else TITLE
+        if get_preview_rows():
+            title += f' (preview: {get_preview_rows()} first rows)'
+        self.setWindowTitle(title)
 
     def load_graph(self, graph, add=False, record_undo=True):
         try:
@@ -346,8 +337,9 @@ class PolarsGraph(QtWidgets.QMainWindow):
                 self.display_widget.set_display_node(display_node_name)
 
         if not add:
-            self.graph = dict()
+            self.graph = Graph()
             self.node_view.clear()
+            profiler.clear()
         else:
             """
             Pasting node: we need to rename everything to avoid clashes
@@ -405,6 +397,7 @@ class PolarsGraph(QtWidgets.QMainWindow):
         if not add:
             self.node_view.set_graph(self.graph)
             self.display_widget.set_graph(self.graph)
+            self.sources_watcher.set_graph(self.graph)
         # SettingsWidget:
         if self.settings_widget.node:
             node_name = self.settings_widget.node['name']
@@ -428,11 +421,53 @@ class PolarsGraph(QtWidgets.QMainWindow):
         self.settings_widget.set_node(node, input_tables)
 
     def set_dirty_recursive(self, node_name: BaseNode):
+        self.graph.index.update_node(node_name)  # inputs may have been edited
         set_dirty_recursive(self.graph, node_name)
 
     def build_node_query(self, node_name):
         build_node_query(self.graph, node_name)
+        if self.graph[node_name].category == LOAD_CATEGORY:
+            self.sources_watcher.update_paths()  # path may have been edited
+        self.update_view_widget()
+
+    def refresh_sources(self, node_names):
+        """
+        Files of these Load nodes were modified on disk.
+        """
+        for node_name in node_names:
+            if node_name in self.graph:
+                self.set_dirty_recursive(node_name)
+        self.node_view.update()
+        self.update_view_widget()
+
+    # Preview
+    def toggle_preview(self):
+        rows = None if get_preview_rows() else DEFAULT_PREVIEW_ROWS
+        set_preview_rows(rows)
+        set_load_nodes_dirty(self.graph)
+        self.update_title()
         self.update_view_widget()
+        self.set_settings_node(self.settings_widget.node)
+
+    def run_full(self):
+        """
+        Display the full result, until the next change.
+        """
+        rows = get_preview_rows()
+        if not rows:
+            return
+        set_preview_rows(None)
+        set_load_nodes_dirty(self.graph)
+        self.update_view_widget()
+        set_preview_rows(rows)
+        set_load_nodes_dirty(self.graph)
+
+    def show_plan(self, node_name):
+        build_node_query(self.graph, node_name)
+        node = self.graph[node_name]
+        plan_inspector = self.settings_widget.plan_inspector
+        plan_inspector.set_table(node_name, get_node_table(self.graph, node))
+        plan_inspector.show()
 
     def update_view_widget(self):
         self.display_widget.update_content()
@@ -455,13 +490,7 @@ class PolarsGraph(QtWidgets.QMainWindow):
             settings['position'] = self.node_view.get_create_position()
 
         # Create node
-        node = create_node(
-            self.graph,
-            types,
-            node_type,
-            name=name,
-            settings=settings,
-            auto_increment=auto_increment)
+        node = self._create_node(node_type, name, settings, auto_increment)
 
         if node_type == 'backdrop':
             # Size backdrop based on selection
@@ -479,10 +508,26 @@ class PolarsGraph(QtWidgets.QMainWindow):
             self.set_settings_node(node)
             self.node_view.update()
             self.display_widget.update_content()
+
+        return node
+
+    def _create_node(self, node_type, name, settings, auto_increment):
+        """
+        Add node to graph and to the widgets following it. Used by user
+        creations, graph loading and undo/redo.
+        """
+        node = create_node(
+            self.graph,
+            types,
+            node_type,
+            name=name,
+            settings=settings,
+            auto_increment=auto_increment)
         # Fill Displays combo
         if node.category in (DISPLAY_CATEGORY, DASHBOARD_CATEGORY):
             self.display_widget.fill_combo()
-
+        elif node.category == LOAD_CATEGORY:
+            self.sources_watcher.update_paths()
         return node
 
     def create_load(self, path):
@@ -501,7 +546,10 @@ class PolarsGraph(QtWidgets.QMainWindow):
         self.autosave()
 
     def delete_nodes(self, node_names_to_delete):
+        index = self.graph.index
         for node_name_to_delete in node_names_to_delete:
+            downstream_names = index.get_downstream_node_names(
+                node_name_to_delete)
             # Preserve connections 1 input & 1 output
             node_to_delete = self.graph[node_name_to_delete]
             for node_input in node_to_delete['inputs'] or []:
@@ -509,9 +557,8 @@ class PolarsGraph(QtWidgets.QMainWindow):
                     continue
                 src_name, src_out_idx = node_input
                 # Find output
-                for other_node in self.graph.values():
-                    if other_node['name'] == node_name_to_delete:
-                        continue
+                for other_name in downstream_names:
+                    other_node = self.graph[other_name]
                     for in_idx, plug in enumerate(other_node['inputs'] or []):
                         if plug and plug[0] == node_name_to_delete:
                             connect_nodes(
@@ -523,16 +570,17 @@ class PolarsGraph(QtWidgets.QMainWindow):
             self.graph.pop(node_name_to_delete)
 
             # Delete inputs pointing to deleted node
-            for other_node in self.graph.values():
-                if other_node['name'] == node_name_to_delete:
-                    continue
+            for other_name in downstream_names:
+                other_node = self.graph[other_name]
                 for i, inputs in enumerate(other_node['inputs'] or []):
                     if not inputs:
                         continue
                     if node_name_to_delete == inputs[0]:
                         other_node['inputs'][i] = None
+                index.update_node(other_name)
 
         self.node_view.delete_nodes(node_names_to_delete)
+        self.sources_watcher.update_paths()
         self.update_view_widget()
         self.autosave()
 
@@ -555,7 +603,8 @@ class PolarsGraph(QtWidgets.QMainWindow):
 
         # Handle cases
         if not plug_out:  # disconnecting plug in
-            disconnect_plug(self.graph[plug_in['name']], plug_in['index'])
+            disconnect_plug(
+                self.graph, self.graph[plug_in['name']], plug_in['index'])
         elif plug_in:  # connecting two plugs
             target_node_name = plug_in['name']
             target_node = self.graph[target_node_name]
@@ -584,7 +633,7 @@ class PolarsGraph(QtWidgets.QMainWindow):
         node = self.graph[node_name]
         src_node = self.graph[src_name]
         dest_node = self.graph[dest_name]
-        disconnect_plug(dest_node, dest_in_idx)
+        disconnect_plug(self.graph, dest_node, dest_in_idx)
         connect_nodes(self.graph, src_node, src_out_idx, node, 0)
         connect_nodes(self.graph, node, 0, dest_node, dest_in_idx)
         self.set_dirty_recursive(node_name)
@@ -701,6 +750,22 @@ class PolarsGraph(QtWidgets.QMainWindow):
         self.save_to_file(
             filepath, selected=selected, set_current=not selected)
 
+    # Profile
+    def toggle_profiles(self):
+        self.node_view.show_profiles = not self.node_view.show_profiles
+        self.node_view.update()
+
+    def prompt_export_profiles(self):
+        filepath, _ = QtWidgets.QFileDialog.getSaveFileName(
+            self, 'Export timings', '', '*.json')
+        if not filepath:
+            return
+        profiler.export(filepath)
+
+    def clear_profiles(self):
+        profiler.clear()
+        self.node_view.update()
+
     # Copy/Paste
     def copy(self):
         QtWidgets.QApplication.clipboard().setText(
@@ -713,27 +778,105 @@ class PolarsGraph(QtWidgets.QMainWindow):
 
     # Autosave
     def autosave(self, record_undo=True):
+        """
+        Save and record undo once the changes stop (e.g. while dragging a
+        spinbox), see `flush_autosave`.
+        """
+        self._autosave_pending = True
+        if record_undo:  # can be a node name, when connected to signals
+            self._autosave_record_undo = True
+        self._autosave_timer.start()
+
+    def flush_autosave(self):
+        self._autosave_timer.stop()
+        if not self._autosave_pending:
+            return
+        record_undo = self._autosave_record_undo
+        self._autosave_pending = False
+        self._autosave_record_undo = False
+
+        # Serialize here: the graph must not change while it is read
+        state = self.get_state()
+        content = join_serialized_nodes(state)
+        content_hash = hashlib.sha1(content.encode()).hexdigest()
+        last_path, last_hash = self._autosave_last
+        if content_hash != last_hash and record_undo:
+            self.add_undo(state)
+        if (self.autosave_path, content_hash) == self._autosave_last:
+            return
         logger.debug('autosave')
-        self.save_to_file(self.autosave_path, set_current=False)
-        if record_undo:
-            self.add_undo()
+        self._autosave_last = self.autosave_path, content_hash
+        self._autosave_future = self._autosave_writer.submit(
+            write_file, self.autosave_path, content)
+        self._autosave_future.add_done_callback(log_autosave_error)
 
     def closeEvent(self, event):
         self.autosave()
+        self.flush_autosave()
+        if self._autosave_future:
+            self._autosave_future.exception()  # wait for the write
         return super().closeEvent(event)
 
     # Undo/Redo
+    def get_state(self) -> dict[str, str]:
+        return {name: node.serialize() for name, node in self.graph.items()}
+
     def _undo_redo(self, action='undo'):
+        self.flush_autosave()  # record the last changes first
         if action == 'undo':
-            graph = self.undo_stack.undo()
+            state = self.undo_stack.undo()
         else:
-            graph = self.undo_stack.redo()
-        if graph:
-            self.load_graph(deserialize_graph(graph), record_undo=False)
+            state = self.undo_stack.redo()
+        if state:
+            # Diff against the live graph: some changes aren't recorded
+            # (e.g. nodes moves)
+            self.restore_state(self.get_state(), state)
+
+    def restore_state(self, current_state, state):
+        """
+        Patch the added, removed and modified nodes only, so the other nodes
+        keep their queries and results.
+        """
+        added, removed, modified = get_changes(current_state, state)
+
+        for node_name in removed:
+            self.graph.pop(node_name)
+        self.node_view.delete_nodes(removed)
+
+        for node_name in added:
+            settings = deserialize_node(state[node_name])
+            if settings['type'] not in types:
+                continue
+            self._create_node(
+                settings['type'], node_name, settings, auto_increment=False)
+
+        for node_name in modified:
+            node = self.graph[node_name]
+            settings = deserialize_node(state[node_name])
+            keys = (set(settings) | set(node.settings)).difference(
+                LAYOUT_ATTRIBUTES)
+            affects_result = any(
+                settings.get(key) != node[key] for key in keys)
+            # Keep settings dict, widgets may hold it
+            node.settings.clear()
+            node.settings.update(settings)
+            if affects_result:
+                self.set_dirty_recursive(node_name)
+
+        self.autosave(record_undo=False)
+        self.sources_watcher.update_paths()
+        self.node_view.update()
+        if removed:
+            self.display_widget.fill_combo()
+        self.update_view_widget()
+        node = self.settings_widget.node
+        if node:
+            node = self.graph.get(node['name'])  # may have been removed
+            self.set_settings_node(node)
 
-    def add_undo(self):
+    def add_undo(self, state=None):
         logger.debug('record undo')
-        self.undo_stack.add(self.serialize_graph())
+        self.undo_stack.add(state or self.get_state())
 
     def undo(self):
         logger.debug('undo')
@@ -747,6 +890,8 @@ class PolarsGraph(QtWidgets.QMainWindow):
     def rename_node(self, old_name, new_name):
         new_name = rename_node(self.graph, old_name, new_name)
         self.node_view.rename_node(old_name, new_name)
+        if self.graph[new_name].category == LOAD_CATEGORY:
+            self.sources_watcher.update_paths()
         self.set_settings_node(self.graph[new_name])
         self.display_widget.fill_combo()
 
@@ -798,6 +943,25 @@ class GraphSettings(BaseNode):
         super().__init__(settings)
 
 
+def write_file(path, content):
+    """
+    Write a temporary file then rename it, so the file is never half written.
+    """
+    temp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+    try:
+        with open(temp_path, 'w') as f:
+            f.write(content)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def log_autosave_error(future):
+    if future.exception():
+        logger.warning(f'Autosave failed: {future.exception()}')
+
+
 def get_preferences():
     try:
         with open(PREFS_PATH, 'r') as f:
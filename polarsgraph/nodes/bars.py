@@ -10,7 +10,8 @@ from PySide6.QtCore import Qt
 from polarsgraph.nodes import GREEN as DEFAULT_COLOR
 from polarsgraph.graph import DISPLAY_CATEGORY
 from polarsgraph.nodes.base import (
-    DISPLAY_INDEX_ATTR, BaseNode, BaseSettingsWidget, BaseDisplay)
+    DISPLAY_INDEX_ATTR, TOP_ROWS_ATTR, BaseNode, BaseSettingsWidget,
+    BaseDisplay, fold_top_rows)
 
 
 COLOR = dict(
@@ -36,6 +37,7 @@ class ATTR:
     NAME = 'name'
     TITLE = 'title'
     DISPLAY_INDEX = DISPLAY_INDEX_ATTR
+    TOP_ROWS = TOP_ROWS_ATTR
     COLORS = 'colors'
 
 
@@ -50,13 +52,17 @@ class BarsNode(BaseNode):
         super().__init__(settings)
 
         self._display_widget = None
+        self.display_query: pl.LazyFrame = None
 
     def _build_query(self, tables):
         self.tables['table'] = tables[0]
-        # Update display
-        if not self.display_widget:
-            return
-        self.display_widget.set_table(tables[0])
+        self.display_query = tables[0]
+        if self[ATTR.TOP_ROWS]:
+            self.display_query = fold_top_rows(
+                tables[0], self[ATTR.TOP_ROWS])
+
+    def set_result(self, df: pl.DataFrame):
+        self.display_widget.set_table(df)
 
     def clear(self):
         pass
@@ -85,6 +91,14 @@ class BarsSettingsWidget(BaseSettingsWidget):
         self.title_edit.editingFinished.connect(
             lambda: self.line_edit_to_settings(self.title_edit, ATTR.TITLE))
 
+        self.top_rows_spinbox = QtWidgets.QSpinBox(
+            maximum=999, specialValueText='all')
+        self.top_rows_spinbox.setToolTip(
+            'Show the biggest bars only, the others are summed')
+        self.top_rows_spinbox.valueChanged.connect(
+            lambda: self.spinbox_to_settings(
+                self.top_rows_spinbox, ATTR.TOP_ROWS))
+
         self.colors_table = QtWidgets.QTableWidget(minimumHeight=250)
         self.colors_table.setColumnCount(2)
         self.colors_table.horizontalHeader().setSectionResizeMode(
@@ -98,6 +112,7 @@ class BarsSettingsWidget(BaseSettingsWidget):
         form_layout.addRow(ATTR.NAME.title(), self.name_edit)
         form_layout.addRow('Display index', self.index_combo)
         form_layout.addRow(ATTR.TITLE.title(), self.title_edit)
+        form_layout.addRow('Top bars', self.top_rows_spinbox)
         layout = QtWidgets.QVBoxLayout(self)
         layout.addLayout(form_layout)
         layout.addWidget(QtWidgets.QLabel('Colors:'))
@@ -109,6 +124,7 @@ class BarsSettingsWidget(BaseSettingsWidget):
         self.input_table: pl.LazyFrame = input_tables[0]
         self.name_edit.setText(node[ATTR.NAME])
         self.title_edit.setText(node[ATTR.TITLE] or '')
+        self.top_rows_spinbox.setValue(node[ATTR.TOP_ROWS] or 0)
         self.populate_color_table()
         self.blockSignals(False)
 
@@ -180,10 +196,7 @@ class BarsDisplay(BaseDisplay):
         layout.setContentsMargins(0, 0, 0, 0)
         layout.addWidget(self.chart_view)
 
-    def set_table(self, table: pl.LazyFrame):
-        if table is None:
-            return
-        table = table.collect()
+    def set_table(self, table: pl.DataFrame):
         self.chart_view.set_data(table, self.node)
 
     def get_pixmap(self):
@@ -202,18 +215,76 @@ class BarsDisplay(BaseDisplay):
         QtWidgets.QApplication.clipboard().setPixmap(self.get_pixmap())
 
 
+class BarsLayout:
+    """
+    Bars geometry as fractions of the chart width, computed once per result
+    with Polars rather than on each paint.
+    """
+    def __init__(self, dataframe: pl.DataFrame, colors: dict):
+        columns = dataframe.columns[1:]
+        if not columns:
+            raise ValueError('Bars need at least one column of values')
+        values = dataframe.select(pl.col(columns).fill_null(0))
+        totals = values.select(pl.sum_horizontal(pl.all())).to_series()
+        max_total = totals.max()
+        self.max_value = get_graph_end_value(max_total) if max_total else 1
+
+        # Each segment starts where the previous one ends
+        widths = values / self.max_value
+        ends = widths.select(pl.cum_sum_horizontal(pl.all())).unnest(
+            'cum_sum')
+
+        self.columns = columns
+        self.colors = [colors[column] for column in columns]
+        self.labels = dataframe.select(
+            pl.first().cast(pl.String).fill_null('')).to_series().to_list()
+        self.widths = [widths[column].to_list() for column in columns]
+        self.starts = [
+            [0.0] * len(dataframe),
+            *(ends[column].to_list() for column in columns[:-1])]
+        self.ends = ends[columns[-1]].to_list()
+        self.totals = [f'{auto_round(total)}' for total in totals]
+
+
 class CustomStackedBarChart(QtWidgets.QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.dataframe = pl.DataFrame()
+        self.layout_: BarsLayout = None
+        self.error = False
+        # Painted chart, replayed until the data or the size change
+        self._pixmap: QtGui.QPixmap = None
 
     def set_data(self, table, node):
         self.dataframe = table
         self.node = node
+        colors = self.node[ATTR.COLORS] or {}
+        colors = {n: QtGui.QColor(c) for n, c in colors.items()}
+        colors = get_bars_colors(table.columns[1:], colors)
+        try:
+            self.layout_ = BarsLayout(table, colors)
+            self.error = False
+            self.node.error = None
+        except BaseException:
+            self.node.error = traceback.format_exc()
+            self.layout_ = None
+            self.error = True
+        self._pixmap = None
         self.update()
 
     def paintEvent(self, event):
+        ratio = self.devicePixelRatioF()
+        size = self.size() * ratio
+        if self._pixmap is None or self._pixmap.size() != size:
+            self._pixmap = QtGui.QPixmap(size)
+            self._pixmap.setDevicePixelRatio(ratio)
+            painter = QtGui.QPainter(self._pixmap)
+            self.paint_chart(painter)
+            painter.end()
         painter = QtGui.QPainter(self)
+        painter.drawPixmap(0, 0, self._pixmap)
+
+    def paint_chart(self, painter: QtGui.QPainter):
         painter.setRenderHint(QtGui.QPainter.Antialiasing)
 
         # Get widget dimensions
@@ -226,27 +297,30 @@ class CustomStackedBarChart(QtWidgets.QWidget):
         painter.fillRect(rect, COLOR['bg'])
 
         # Title
-        try:
-            totals = self.dataframe.select(
-                self.dataframe.columns[1:]).sum_horizontal()
-            max_value = get_graph_end_value(totals.max())
-        except BaseException:
+        layout = self.layout_
+        if self.error:
+            painter.setPen(COLOR['text'])
             painter.drawText(rect, Qt.AlignmentFlag.AlignHCenter, 'Error')
-            print(traceback.format_exc())
+            return
+        if layout is None:
             return
         title = self.node[ATTR.TITLE] or self.node[ATTR.NAME]
+        painter.setPen(COLOR['text'])
         painter.drawText(rect, Qt.AlignmentFlag.AlignHCenter, title)
+        if not layout.labels:
+            return
 
         # BG Lines
         bg_rect = rect.adjusted(
             margin, margin + title_offset, -margin, -margin - legend_offset)
-        bar_height = bg_rect.height() / len(self.dataframe)
+        bar_height = bg_rect.height() / len(layout.labels)
+        bg_width = bg_rect.width()
 
         line_positions = 0, 0.25, 0.5, 0.75, 1.0
         painter.setPen(QtGui.QPen(COLOR['bg_lines'], .5))
         bottom = bg_rect.bottom()
         for pos in line_positions:
-            x = bg_rect.left() + pos * bg_rect.width()
+            x = bg_rect.left() + pos * bg_width
             painter.drawLine(x, rect.top(), x, bottom)
             if pos == 0:
                 continue
@@ -257,16 +331,15 @@ class CustomStackedBarChart(QtWidgets.QWidget):
             else:
                 pos_rect = QtCore.QRectF(x - 100, bottom - 20, 200, 50)
                 alignment = Qt.AlignCenter
-            painter.drawText(pos_rect, alignment, f'{int(max_value * pos)}')
+            painter.drawText(
+                pos_rect, alignment, f'{int(layout.max_value * pos)}')
 
         # Legend
-        colors = self.node[ATTR.COLORS] or {}
-        colors = {n: QtGui.QColor(c) for n, c in colors.items()}
-        colors = get_bars_colors(self.dataframe.columns[1:], colors)
         y = rect.bottom() - legend_offset + margin / 2
-        width = (rect.width() - 200) / len(colors) - margin
-        painter.setPen(Qt.NoPen)
-        for i, (label, color) in enumerate(colors.items()):
+        if layout.columns:
+            width = (rect.width() - 200) / len(layout.columns) - margin
+        for i, (label, color) in enumerate(
+                zip(layout.columns, layout.colors)):
             x = 100 + i * (width + margin)
             painter.setPen(Qt.NoPen)
             painter.setBrush(color)
@@ -276,45 +349,41 @@ class CustomStackedBarChart(QtWidgets.QWidget):
             painter.setPen(COLOR['text'])
             painter.drawText(legend_rect, Qt.AlignCenter, label)
 
-        # Draw each row as a horizontal stacked bar
-        for i, row in enumerate(self.dataframe.iter_rows(named=True)):
+        # Draw bars segments, column by column
+        painter.setPen(Qt.NoPen)
+        segment_height = bar_height * .7
+        for color, starts, widths in zip(
+                layout.colors, layout.starts, layout.widths):
+            painter.setBrush(color)
+            for i, (start, width) in enumerate(zip(starts, widths)):
+                y = title_offset + margin + i * bar_height
+                painter.drawRect(QtCore.QRectF(
+                    margin + start * bg_width, y,
+                    width * bg_width, segment_height))
+
+        # Draw labels and totals
+        painter.setPen(COLOR['text'])
+        label_width = rect.width() - margin * 2
+        for i, (label, end, total) in enumerate(
+                zip(layout.labels, layout.ends, layout.totals)):
             y = title_offset + margin + i * bar_height
-            x = margin
-            total_width = 0
-            for j, column in enumerate(self.dataframe.columns[1:]):
-                value = row[column] or 0
-                width = (value / max_value) * bg_rect.width()
-
-                # Set color for the bar segment
-                painter.setPen(Qt.NoPen)
-                painter.setBrush(colors[column])
-
-                # Draw bar segment
-                bar_rect = QtCore.QRectF(x, y, width, bar_height * .7)
-                painter.drawRect(bar_rect)
-                x += width
-                total_width += width
-
-            # Draw label
-            label = row[self.dataframe.columns[0]]
-            painter.setPen(COLOR['text'])
             line_rect = QtCore.QRectF(
-                margin * 2, y, rect.width() - margin * 2, bar_height * .7)
+                margin * 2, y, label_width, segment_height)
             updated_text_rect = painter.drawText(
                 line_rect, Qt.AlignLeft | Qt.AlignVCenter, label)
 
-            # Draw total
-            total = f'{auto_round(totals[i])}'
-            if bar_rect.right() < updated_text_rect.right() + 40:
-                bar_rect.setX(updated_text_rect.right() + margin)
-                bar_rect.setWidth(1000)
+            bar_right = margin + end * bg_width
+            if bar_right < updated_text_rect.right() + 40:
+                total_rect = QtCore.QRectF(
+                    updated_text_rect.right() + margin, y,
+                    1000, segment_height)
                 painter.drawText(
-                    bar_rect, Qt.AlignLeft | Qt.AlignVCenter, f'({total})')
+                    total_rect, Qt.AlignLeft | Qt.AlignVCenter, f'({total})')
             else:
-                bar_rect = QtCore.QRectF(
-                    0, y, total_width - margin/2, bar_height * .7)
+                total_rect = QtCore.QRectF(
+                    0, y, end * bg_width - margin / 2, segment_height)
                 painter.drawText(
-                    bar_rect, Qt.AlignRight | Qt.AlignVCenter, total)
+                    total_rect, Qt.AlignRight | Qt.AlignVCenter, total)
 
 
 @lru_cache()
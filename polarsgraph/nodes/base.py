@@ -9,6 +9,7 @@ from polarsgraph.graph import BaseNode
 
 TRUE_WORDS = '1', 'true', 'yes'
 DISPLAY_INDEX_ATTR = 'display_index'
+TOP_ROWS_ATTR = 'top_rows'
 
 
 class FORMAT:
@@ -106,6 +107,12 @@ class BaseDisplay(QtWidgets.QWidget):
     def set_board_mode(self, board_enabled: bool):
         pass
 
+    def set_busy(self, busy: bool):
+        if busy:
+            self.setCursor(QtCore.Qt.CursorShape.BusyCursor)
+        else:
+            self.unsetCursor()
+
     def showEvent(self, event):
         self.shown.emit()
         return super().showEvent(event)
@@ -137,6 +144,30 @@ def set_combo_values_from_table_columns(
     set_combo_values(combo, values, current_text)
 
 
+def fold_top_rows(df: pl.LazyFrame, count: int, label='others'):
+    """
+    Keep the `count` rows with the highest values (sum of the columns after
+    the first, labels one), and sum the other rows into a single row
+    labeled `label`. Order of the kept rows is preserved.
+    """
+    columns = df.collect_schema().names()
+    label_column, value_columns = columns[0], columns[1:]
+    rank = pl.sum_horizontal(value_columns).rank(
+        'ordinal', descending=True)
+    df = df.with_columns(
+        pl.col(label_column).cast(pl.String), _rank=rank)
+    top = df.filter(pl.col('_rank') <= count).drop('_rank')
+    others = (
+        df.filter(pl.col('_rank') > count)
+        .select(
+            pl.lit(label, pl.String).alias(label_column),
+            pl.col(value_columns).sum(),
+            _count=pl.len())
+        .filter(pl.col('_count') > 0)
+        .drop('_count'))
+    return pl.concat([top, others], how='vertical_relaxed')
+
+
 def to_boolean(value):
     if value in (True, False):
         return value
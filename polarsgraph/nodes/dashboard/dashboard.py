@@ -4,6 +4,7 @@ from polarsgraph.nodes import GREEN as DEFAULT_COLOR
 from polarsgraph.graph import (
     DASHBOARD_CATEGORY, DYNAMIC_PLUG_COUNT, get_input_nodes,
     build_node_query)
+from polarsgraph.executor import collect_display_nodes, cancel_display_node
 from polarsgraph.nodes.base import (
     DISPLAY_INDEX_ATTR, BaseNode, BaseSettingsWidget, BaseDisplay)
 
@@ -56,13 +57,19 @@ class DashboardNode(BaseNode):
 
         # Widgets
         layout.clear()
+        built_nodes = []
         for node in get_input_nodes(graph, self['name']):
             display_widget: BaseDisplay = node.display_widget
             layout.addWidget(display_widget)
             display_widget.setVisible(True)
             display_widget.set_board_mode(True)
-            if not build_node_query(graph, node['name']):
+            if build_node_query(graph, node['name']):
+                built_nodes.append(node)
+            else:
+                cancel_display_node(node)
                 node.clear()
+        # Collect all displays at once to share their common upstream
+        collect_display_nodes(graph, self['name'], built_nodes)
         layout.rects = self[ATTR.WIDGETS_RECTANGLES]
 
     @property
@@ -208,6 +208,11 @@ class ColorMapWidget(QtWidgets.QWidget):
         # Widgets
         self.gradient_cb = QtWidgets.QCheckBox('Gradient')
         self.gradient_cb.setChecked(rules.get('gradient', True))
+        self.gradient_cb.toggled.connect(self.set_steps_enabled)
+
+        self.steps_spinbox = QtWidgets.QSpinBox(
+            minimum=0, maximum=256, specialValueText='continuous')
+        self.steps_spinbox.setValue(rules.get('steps') or 0)
 
         self.table = QtWidgets.QTableWidget()
         self.table.setColumnCount(2)
@@ -228,8 +233,14 @@ class ColorMapWidget(QtWidgets.QWidget):
         button_layout.addWidget(self.add_color_btn)
         button_layout.addWidget(self.remove_color_btn)
 
+        gradient_layout = QtWidgets.QHBoxLayout()
+        gradient_layout.addWidget(self.gradient_cb)
+        gradient_layout.addStretch()
+        gradient_layout.addWidget(QtWidgets.QLabel('Steps:'))
+        gradient_layout.addWidget(self.steps_spinbox)
+
         layout = QtWidgets.QVBoxLayout(self)
-        layout.addWidget(self.gradient_cb)
+        layout.addLayout(gradient_layout)
         layout.addWidget(self.table)
         layout.addWidget(self.color_result)
         layout.addLayout(button_layout)
@@ -238,6 +249,10 @@ class ColorMapWidget(QtWidgets.QWidget):
         for value, color in rules.get('map', []):
             self._add_row(value, QtGui.QColor(color))
         self.set_color_info()
+        self.set_steps_enabled()
+
+    def set_steps_enabled(self):
+        self.steps_spinbox.setEnabled(self.gradient_cb.isChecked())
 
     def _add_row(self, value, color: QtGui.QColor):
         row_index = self.table.rowCount()
@@ -297,6 +312,7 @@ class ColorMapWidget(QtWidgets.QWidget):
         return dict(
             type=COLORTYPE.MAP,
             gradient=self.gradient_cb.isChecked(),
+            steps=self.steps_spinbox.value(),
             map=map)
 
 
@@ -321,121 +337,121 @@ def colors_to_css_gradient(colors: list[str]):
     return f'background-color: qlineargradient(x1:0, y1:0, x2:1, y2:0{stops});'
 
 
-def generate_color_columns(
-        df: pl.DataFrame,
+def get_color_expressions(
+        schema: pl.Schema,
         rules: dict,
-        default_color):
+        default_color) -> list[pl.Expr]:
+    """
+    Expressions of the background color columns, to apply all at once.
+    """
     rules = rules or {}
-    schema = df.collect_schema()
+    expressions = []
     for column, data_type in schema.items():
         column_rules = rules.get(column)
         if not column_rules or column_rules.get('type') == COLORTYPE.NONE:
-            if default_color:
-                df = df.with_columns(
-                    pl.lit(default_color).alias(get_bgcolor_name(column)))
-            else:
-                df = df.with_columns(
-                    pl.lit('').alias(get_bgcolor_name(column)))
+            expression = pl.lit(default_color or '')
         elif column_rules.get('type') == COLORTYPE.MAP:
-            df = get_column_gradient_colors(
-                df, column, column_rules, data_type, default_color)
+            expression = get_column_gradient_colors(
+                column, column_rules, data_type, default_color)
         elif column_rules.get('type') == COLORTYPE.STEPS:
-            df = get_column_step_colors(
-                df, column, column_rules, data_type)
-    return df
+            expression = get_column_step_colors(
+                column, column_rules, data_type)
+        else:
+            expression = None
+        if expression is not None:
+            expressions.append(expression.alias(get_bgcolor_name(column)))
+    return expressions
 
 
 def get_column_gradient_colors(
-        df: pl.LazyFrame, column, column_rules, data_type, default_color):
+        column, column_rules, data_type, default_color) -> pl.Expr | None:
     if not column_rules:
-        return df
+        return None
     colors_values = column_rules.get('map')
     if not colors_values:
-        return df
+        return None
 
     # Convert values
     converter = get_converter(data_type)
     colors_values = [(converter(v), c) for v, c in colors_values]
 
-    # Choose between == and >=
     col_exp = pl.col(column)
     if column_rules.get('gradient') and data_type.is_numeric():
-        col_method = getattr(col_exp, '__le__')
-        colors_values = extend_color_values_steps(colors_values)
+        expression = get_gradient_expression(
+            col_exp, sorted(colors_values), column_rules.get('steps'))
     else:
-        col_method = getattr(col_exp, '__eq__')
-
-    # Start expression to skip nan and inf
-    expression = pl.when(col_exp.is_infinite()).then(pl.lit(default_color))
-    expression = expression.when(col_exp.is_nan()).then(pl.lit(default_color))
-    expression = expression.when(col_exp.is_null()).then(pl.lit(default_color))
-
-    # Loop through rest of values
-    if len(colors_values) > 1:
-        for value, color in colors_values:
-            expression = expression.when(col_method(value)).then(pl.lit(color))
-
-    if column_rules.get('gradient'):
-        if data_type.is_numeric():
-            # If gradient, end with last color
-            last_color = colors_values[-1][1]
-            expression = expression.otherwise(pl.lit(last_color))
-        else:
-            expression = expression.otherwise(pl.lit(default_color))
+        values = [v for v, _ in colors_values]
+        colors = [c for _, c in colors_values]
+        # Unmatched values keep the default color only on gradients
+        default = default_color if column_rules.get('gradient') else None
+        expression = col_exp.replace_strict(
+            values, colors, default=default, return_dtype=pl.String)
+
+    # Skip nan and inf
+    invalid = col_exp.is_null()
+    if data_type.is_float():
+        invalid = invalid | col_exp.is_nan() | col_exp.is_infinite()
+    return pl.when(invalid).then(pl.lit(default_color)).otherwise(expression)
+
+
+def get_gradient_expression(
+        col_exp: pl.Expr, colors_values: list, steps=None) -> pl.Expr:
+    """
+    Interpolate the color of each value between the two surrounding values
+    of the map. Values out of the map get the first or the last color.
 
-    # Apply to df
-    return df.with_columns(expression.alias(get_bgcolor_name(column)))
+    If `steps` is set, the gradient is quantized in that many colors.
+    """
+    if len(colors_values) == 1:
+        return pl.lit(colors_values[0][1])
+    values = pl.Series([float(v) for v, _ in colors_values])
+    minimum, maximum = values[0], values[-1]
+    col_exp = col_exp.cast(pl.Float64).clip(minimum, maximum)
+    if steps and maximum > minimum:
+        ratio = (col_exp - minimum) / (maximum - minimum)
+        step = (ratio * steps).floor().clip(0, steps - 1)
+        ratio = step / max(steps - 1, 1)
+        col_exp = minimum + ratio * (maximum - minimum)
+
+    # Find the surrounding values
+    upper = pl.lit(values).search_sorted(col_exp, side='left').clip(
+        1, len(values) - 1)
+    lower = upper - 1
+    value1 = pl.lit(values).gather(lower)
+    value2 = pl.lit(values).gather(upper)
+    ratio = ((col_exp - value1) / (value2 - value1)).fill_nan(1)
+
+    # Interpolate each channel and format it as hexadecimal
+    channels = zip(*[webcolor_to_ints(c) for _, c in colors_values])
+    hexadecimals = pl.Series([f'{i:02X}' for i in range(256)])
+    expressions = [pl.lit('#')]
+    for channel in channels:
+        channel = pl.Series(channel, dtype=pl.Float64)
+        channel1 = pl.lit(channel).gather(lower)
+        channel2 = pl.lit(channel).gather(upper)
+        channel = channel1 + (channel2 - channel1) * ratio
+        expressions.append(
+            pl.lit(hexadecimals).gather(channel.cast(pl.Int64)))
+    return pl.concat_str(expressions)
 
 
 def get_column_step_colors(
-        df: pl.LazyFrame, column, column_rules, data_type):
+        column, column_rules, data_type) -> pl.Expr | None:
     if not column_rules:
-        return df
+        return None
     colors = column_rules['colors']
     if not colors:
-        return df
+        return None
     if len(colors) == 1:
-        color = column_rules['colors'][0]
-        return df.with_columns(pl.lit(color).alias(column))
+        return pl.lit(colors[0])
     values = convert_values(column_rules['values'], data_type)
     assert len(values) == len(colors) - 1
-    col_exp = pl.col(column)
-
-    # Chain conditions
-    """
-    color_df = df.with_columns(
-        pl.when(pl.col("foo") > 2)
-        .then(1)
-        .when(pl.col("bar") > 2)
-        .then(4)
-        .otherwise(-1)
-        .alias("val")
-    )
-    """
     assert values == sorted(values)
-    values = values[::-1]  # dont reverse in-place
-    colors = colors[::-1]
-    expression = pl.when(
-        col_exp > values[0]).then(pl.lit(colors[0]))
-    for i, value in enumerate(values):
-        expression = expression.when(col_exp > value).then(
-            pl.lit(colors[i]))
-    expression = expression.otherwise(pl.lit(colors[-1]))
-
-    # Apply to df
-    return df.with_columns(expression.alias(get_bgcolor_name(column)))
-
-
-def get_closest_value_index(value, values):
-    min_delta = max(values) - min(values)
-    for i, value2 in enumerate(values):
-        delta = abs(value - value2)
-        if delta == 0:
-            return i
-        if delta < min_delta:
-            min_delta = delta
-            found_index = i
-    return found_index
+
+    # Index of the first color whose value is not exceeded
+    values = pl.Series(values, dtype=data_type)
+    index = pl.lit(values).search_sorted(pl.col(column), side='left')
+    return pl.lit(pl.Series(colors)).gather(index)
 
 
 def webcolor_to_ints(c):
@@ -443,50 +459,15 @@ def webcolor_to_ints(c):
     return int(c[0:2], 16), int(c[2:4], 16), int(c[4:6], 16)
 
 
-def interpolate_between_two_colors(color1, color2, ratio=0.5):
-    color1 = webcolor_to_ints(color1)
-    color2 = webcolor_to_ints(color2)
-    r, g, b = [int(a + (b - a) * ratio) for a, b in zip(color1, color2)]
-    return f'#{r:02X}{g:02X}{b:02X}'
-
-
-def extend_color_values_steps(colors_values, target_count=64):
-    """
-    Add values/colors couple to make an almost-gradient
-    """
-    current_count = len(colors_values)
-    if current_count >= target_count:
-        return colors_values
-    # Create new list of values
-    values = [_[0] for _ in colors_values]
-    min_val, max_val = min(values), max(values)
-    step = (max_val - min_val) / target_count
-    new_values = [min_val + step * i for i in range(target_count)]
-    # Make sure original values are part of the list
-    for value in values:
-        new_values[get_closest_value_index(value, new_values)] = value
-    # Create new value/color pairs
-    new_colors_values = []
-    for new_value in new_values:
-        for i in range(len(colors_values)):
-            value1, color1 = colors_values[i]
-            value2, color2 = colors_values[i + 1]
-            if new_value == value1:
-                new_colors_values.append((new_value, color1))
-                break
-            if new_value < value1:
-                continue
-            if new_value > value2:
-                continue
-            ratio = (new_value - value1) / (value2 - value1)
-            color = interpolate_between_two_colors(color1, color2, ratio)
-            new_colors_values.append((new_value, color))
-            break
-    return new_colors_values
-
-
 if __name__ == '__main__':
-    colors_values = [(0, '#000000'), (4.0, '#404040')]
+    colors_values = [(0, '#000000'), (4.0, '#404040'), (8.0, '#FF0000')]
+    df = pl.DataFrame({'v': [-1.0, 0.0, 1.0, 2.0, 4.0, 6.0, 8.0, 9.0]})
+    colors = df.select(get_gradient_expression(
+        pl.col('v'), colors_values)).to_series().to_list()
     expected = [
-        (0, '#000000'), (1.0, '#101010'), (2.0, '#202020'), (4.0, '#404040')]
-    assert extend_color_values_steps(colors_values, 4) == expected
+        '#000000', '#000000', '#101010', '#202020', '#404040', '#9F2020',
+        '#FF0000', '#FF0000']
+    assert colors == expected, colors
+    colors = df.select(get_gradient_expression(
+        pl.col('v'), colors_values, steps=2)).to_series().to_list()
+    assert colors == ['#000000'] * 4 + ['#FF0000'] * 4, colors
@@ -9,7 +9,7 @@ from polarsgraph.graph import MANIPULATE_CATEGORY
 from polarsgraph.nodes.base import (
     BaseNode, BaseSettingsWidget, get_format_exp)
 from polarsgraph.nodes.format.colors import (
-    DisplayRuleWidget, generate_color_columns)
+    DisplayRuleWidget, get_color_expressions)
 
 
 class ATTR:
@@ -33,26 +33,33 @@ class FormatNode(BaseNode):
 
     def _build_query(self, tables):
         df: pl.LazyFrame = tables[0]
-
-        # 1. Generate color columns
-        df = generate_color_columns(
-            df=df,
-            default_color=self[ATTR.DEFAULT_BACKGROUND_COLOR],
-            rules=self[ATTR.DISPLAY_RULES])
-
-        # 2. Apply formats to columns
+        schema = df.collect_schema()
         all_to_string = self[ATTR.ALL_COLUMNS_AS_STRING] in (None, True)
         column_rules = self[ATTR.DISPLAY_RULES] or {}
-        for col_name in df.collect_schema():
-            rule = column_rules.get(col_name, {})
-            col = pl.col(col_name)
-            fmt = rule.get('format')
-            exp = get_format_exp(col, fmt)
+
+        # All expressions read the input columns: colors are computed from
+        # the values before they are formatted, in a single projection
+        expressions = {}
+
+        # 1. Apply formats to columns
+        for col_name in schema:
+            fmt = column_rules.get(col_name, {}).get('format')
+            exp = get_format_exp(pl.col(col_name), fmt)
             if all_to_string and fmt != 'string':
                 exp = exp.cast(pl.String)
-            df = df.with_columns(exp)
+            expressions[col_name] = exp
+
+        # 2. Generate color columns
+        color_expressions = get_color_expressions(
+            schema=schema,
+            default_color=self[ATTR.DEFAULT_BACKGROUND_COLOR],
+            rules=column_rules)
+        for exp in color_expressions:
+            if all_to_string:
+                exp = exp.cast(pl.String)
+            expressions[exp.meta.output_name()] = exp
 
-        self.tables['table'] = df
+        self.tables['table'] = df.with_columns(**expressions)
 
 
 class FormatSettingsWidget(BaseSettingsWidget):
@@ -36,15 +36,13 @@ class LabelNode(BaseNode):
         super().__init__(settings)
 
         self._display_widget = None
+        self.display_query: pl.LazyFrame = None
 
     def _build_query(self, tables: list[pl.LazyFrame]):
-        # Update display
-        if not self.display_widget:
-            return
-
         hardcoded_text = self[ATTR.HARDCODED_TEXT]
         if hardcoded_text:
-            return self.display_widget.set_label(hardcoded_text)
+            self.display_query = pl.LazyFrame({'text': [hardcoded_text]})
+            return
 
         source_column_name = self[ATTR.SOURCE_COLUMN]
         source_row = self[ATTR.SOURCE_ROW]
@@ -54,9 +52,10 @@ class LabelNode(BaseNode):
         df = tables[0]
         col = pl.col(source_column_name)
         exp = get_format_exp(col, fmt)
-        value = df.select(exp.get(source_row)).collect()[0, 0]
+        self.display_query = df.select(exp.get(source_row))
 
-        self.display_widget.set_label(str(value))
+    def set_result(self, df: pl.DataFrame):
+        self.display_widget.set_label(str(df[0, 0]))
 
     def clear(self):
         pass
@@ -1,9 +1,13 @@
+import traceback
+from functools import partial
+
 import polars as pl
 from PySide6 import QtWidgets, QtGui, QtCharts, QtCore
 from PySide6.QtCore import Qt
 
 from polarsgraph.nodes import GREEN as DEFAULT_COLOR
 from polarsgraph.graph import DISPLAY_CATEGORY
+from polarsgraph.executor import get_executor
 from polarsgraph.nodes.base import (
     DISPLAY_INDEX_ATTR, BaseNode, BaseSettingsWidget, BaseDisplay)
 
@@ -23,6 +27,10 @@ class ATTR:
     INVERT_AXES = 'invert_axes'
 
 
+DEFAULT_BUCKETS = 1000  # min/max buckets per series, ~ chart width in pixels
+ZOOM_DELAY = 200  # ms, wait for the zoom to stop before refetching
+
+
 class LinesNode(BaseNode):
     type = 'lines'
     category = DISPLAY_CATEGORY
@@ -34,16 +42,50 @@ class LinesNode(BaseNode):
         super().__init__(settings)
 
         self._display_widget = None
+        self.display_query: pl.LazyFrame = None
+        self.query: pl.LazyFrame = None  # kept to refetch zoomed ranges
+        self.buckets = DEFAULT_BUCKETS
+
+    @property
+    def zoom_key(self):
+        # Zoom jobs must not cancel the display refresh, which has the node
+        # name as key
+        return f'{self["name"]}:zoom'
 
     def _build_query(self, tables):
+        get_executor().cancel(self.zoom_key)  # range of outdated data
         self.tables['table'] = tables[0]
-        # Update display
-        if not self.display_widget:
+        self.display_query = tables[0]
+        self.query = tables[0]
+
+    def get_fetch_query(self, df: pl.LazyFrame, x_range=None):
+        """
+        Get the points of each series, decimated to what the chart can show.
+        """
+        return get_points(
+            df, self.buckets, bool(self[ATTR.INVERT_AXES]), x_range)
+
+    def fetch(self, df: pl.LazyFrame, context: str, x_range=None):
+        return self.collect(self.get_fetch_query(df, x_range), context)
+
+    def fetch_range(self, x_range):
+        """
+        Refetch the points of the zoomed range in full resolution.
+        """
+        if self.query is None:
             return
-        self.display_widget.set_table(tables[0])
+        self.display_widget.set_busy(True)
+        get_executor().submit(
+            self.zoom_key,
+            partial(self.fetch, self.query, self.cache_context, x_range),
+            partial(self.display_widget.set_table, zoomed=True),
+            self.display_widget.set_error)
+
+    def set_result(self, df: pl.DataFrame):
+        self.display_widget.set_table(df)
 
     def clear(self):
-        pass
+        self.display_widget.set_error('Error')
 
     @property
     def display_widget(self):
@@ -94,32 +136,64 @@ class LinesDisplay(BaseDisplay):
 
         self.node: LinesNode = node
         self._resizing = False
+        # X range of the fetched points, axis changes to other ranges come
+        # from the user zooming
+        self._fetched_range: tuple[float, float] = None
 
         # Widgets
         self.chart_view = QtCharts.QChartView()
         self.chart_view.setRenderHint(QtGui.QPainter.RenderHint.Antialiasing)
+        # Drag to zoom, right click to zoom out
+        self.chart_view.setRubberBand(
+            QtCharts.QChartView.RubberBand.RectangleRubberBand)
         self.error_label = QtWidgets.QLabel('Error')
 
+        self.zoom_timer = QtCore.QTimer(self)
+        self.zoom_timer.setSingleShot(True)
+        self.zoom_timer.setInterval(ZOOM_DELAY)
+        self.zoom_timer.timeout.connect(self._fetch_zoomed_range)
+
         # Layout
         layout = QtWidgets.QVBoxLayout(self)
         layout.setContentsMargins(0, 0, 0, 0)
         layout.addWidget(self.chart_view)
         layout.addWidget(self.error_label)
 
-    def set_table(self, table: pl.LazyFrame):
-        if table is None:
-            return
-        table = table.collect()
-        title = self.node[ATTR.TITLE] or self.node[ATTR.NAME]
-        invert_axes = bool(self.node[ATTR.INVERT_AXES])
-        self.node.error = make_chart(
-            self.chart_view, table, title, invert_axes)
-        if self.node.error:
-            self.chart_view.setVisible(False)
-            self.error_label.setVisible(True)
-        else:
-            self.chart_view.setVisible(True)
-            self.error_label.setVisible(False)
+    def set_table(self, table: pl.DataFrame, zoomed=False):
+        self.set_busy(False)
+        try:
+            if zoomed:
+                set_series_points(self.chart_view.chart(), table)
+            else:
+                title = self.node[ATTR.TITLE] or self.node[ATTR.NAME]
+                make_chart(self.chart_view, table, title)
+                self._fetched_range = get_x_range(table)
+                axis_x = self.chart_view.chart().axes(Qt.Horizontal)[0]
+                axis_x.rangeChanged.connect(lambda: self.zoom_timer.start())
+        except BaseException:
+            self.node.error = traceback.format_exc()
+            return self.set_error(self.node.error)
+        self.node.error = None
+        self.chart_view.setVisible(True)
+        self.error_label.setVisible(False)
+
+    def set_error(self, error):
+        self.set_busy(False)
+        self.error_label.setText(error.strip().split('\n')[-1])
+        self.chart_view.setVisible(False)
+        self.error_label.setVisible(True)
+
+    def _fetch_zoomed_range(self):
+        axis_x = self.chart_view.chart().axes(Qt.Horizontal)[0]
+        x_range = axis_x.min(), axis_x.max()
+        if x_range == self._fetched_range:
+            return  # automatic range of the fetched points
+        self._fetched_range = x_range
+        self.node.fetch_range(x_range)
+
+    def resizeEvent(self, event):
+        self.node.buckets = max(DEFAULT_BUCKETS, self.width())
+        return super().resizeEvent(event)
 
     def get_pixmap(self):
         pixmap = QtGui.QPixmap(self.chart_view.size())
@@ -137,11 +211,92 @@ class LinesDisplay(BaseDisplay):
         QtWidgets.QApplication.clipboard().setPixmap(self.get_pixmap())
 
 
+def decimate(df: pl.LazyFrame, buckets: int) -> pl.LazyFrame:
+    """
+    Min/max decimation: split rows in `buckets` and only keep the first,
+    last, lowest and highest points of each, so the drawn line looks the
+    same. Order of the rows is kept.
+    """
+    bucket = pl.col('index') * buckets // pl.len()
+    index = pl.col('index')
+    keep = (
+        (index == index.first().over('bucket')) |
+        (index == index.last().over('bucket')) |
+        (index == index.get(pl.col('y').arg_min()).over('bucket')) |
+        (index == index.get(pl.col('y').arg_max()).over('bucket')))
+    return (
+        df.with_row_index()
+        .with_columns(bucket=bucket)
+        .filter(keep)
+        .drop('index', 'bucket'))
+
+
+def get_points(
+        df: pl.LazyFrame,
+        buckets: int,
+        invert_axes: bool = False,
+        x_range: tuple[float, float] = None) -> pl.LazyFrame:
+    """
+    Return the points of all series as `series`, `x`, `y` columns. Series
+    are the (X, Y) column pairs of the table.
+    """
+    columns = df.collect_schema().names()
+    if len(columns) % 2 != 0:
+        raise ValueError(
+            'Dataframe must have an even number of columns (pairs of X,Y)')
+
+    series_points = []
+    for index in range(0, len(columns), 2):
+        x, y = columns[index:index + 2]
+        if invert_axes:
+            x, y = y, x
+        points = df.select(
+            series=pl.lit(index // 2, pl.UInt32),
+            x=pl.col(x).cast(pl.Float64).fill_null(0),
+            y=pl.col(y).cast(pl.Float64).fill_null(0))
+        if x_range:
+            points = points.filter(pl.col('x').is_between(*x_range))
+        series_points.append(decimate(points, buckets))
+    if not series_points:
+        return pl.LazyFrame(schema=dict(
+            series=pl.UInt32, x=pl.Float64, y=pl.Float64))
+    return pl.concat(series_points)
+
+
+def get_x_range(dataframe: pl.DataFrame) -> tuple[float, float] | None:
+    if dataframe.is_empty():
+        return None
+    return dataframe['x'].min(), dataframe['x'].max()
+
+
+def get_series_points(
+        dataframe: pl.DataFrame,
+        series_count: int = None) -> list[list[QtCore.QPointF]]:
+    if series_count is None:
+        series_count = (
+            0 if dataframe.is_empty() else dataframe['series'].max() + 1)
+    points = [[] for _ in range(series_count)]
+    Point = QtCore.QPointF
+    frames = dataframe.partition_by('series', as_dict=True)
+    for (index, ), df in frames.items():
+        points[index] = [Point(x, y) for x, y in zip(df['x'], df['y'])]
+    return points
+
+
+def set_series_points(chart: QtCharts.QChart, dataframe: pl.DataFrame):
+    all_series = chart.series()
+    for series, points in zip(
+            all_series, get_series_points(dataframe, len(all_series))):
+        series.replace(points)
+
+
 def make_chart(
         chart_view: QtCharts.QChartView,
         dataframe: pl.DataFrame,
-        title: str,
-        invert_axes: bool = False):
+        title: str):
+    """
+    `dataframe` holds the points of the series, see `get_points()`.
+    """
     # Create the chart
     chart = QtCharts.QChart()
     chart.setTitle(title)
@@ -150,23 +305,10 @@ def make_chart(
     chart.setMargins(QtCore.QMargins(0, 0, 0, 0))
 
     # Create one line series per column pair
-    num_columns = dataframe.width
-    if num_columns % 2 != 0:
-        raise ValueError(
-            'Dataframe must have an even number of columns (pairs of X,Y)')
-
     series_list = []
-    for col_index in range(0, num_columns, 2):
+    for points in get_series_points(dataframe):
         series = QtCharts.QLineSeries()
-        for row in dataframe.iter_rows():
-            x = row[col_index] or 0
-            y = row[col_index + 1] or 0
-            if invert_axes:
-                x, y = y, x
-            try:
-                series.append(x, y)
-            except TypeError as e:
-                return str(e)
+        series.replace(points)
         series_list.append(series)
         chart.addSeries(series)
 
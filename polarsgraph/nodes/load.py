@@ -1,8 +1,11 @@
 import os
+import glob
 
 from PySide6 import QtWidgets
 import polars as pl
 
+from polarsgraph import cache
+from polarsgraph.profiler import format_size
 from polarsgraph.nodes import BLACK as DEFAULT_COLOR
 from polarsgraph.graph import LOAD_CATEGORY
 from polarsgraph.nodes.base import BaseNode, BaseSettingsWidget
@@ -13,16 +16,56 @@ class ATTR:
     PATH = 'path'
     CSV_SEPARATOR = 'csv_separator'
     PREFIX = 'columns_prefix'
-
-
-OPEN_FUNCTIONS = {
+    SHEET = 'sheet_name'
+    HIVE = 'hive_partitioning'
+
+
+# Formats which can be scanned lazily: the readers only load what the
+# downstream query needs (projection/predicate/slice pushdown)
+SCAN_FUNCTIONS = {
+    'csv': pl.scan_csv,
+    'parquet': pl.scan_parquet,
+    'ndjson': pl.scan_ndjson,
+    'jsonl': pl.scan_ndjson,
+    'ipc': pl.scan_ipc,
+    'arrow': pl.scan_ipc,
+    'feather': pl.scan_ipc,
+}
+# Formats which must be entirely read in memory (parsed tables are cached)
+READ_FUNCTIONS = {
     'xlsx': pl.read_excel,
     'ods': pl.read_ods,
-    'csv': pl.read_csv,
-    'parquet': pl.read_parquet,
     'json': pl.read_json,
 }
+OPEN_FUNCTIONS = {**READ_FUNCTIONS, **SCAN_FUNCTIONS}
 MASK = ' '.join([f'*.{ext}' for ext in OPEN_FUNCTIONS])
+# Formats whose readers can prune files of key=value directories
+HIVE_EXTENSIONS = 'parquet', 'ipc', 'arrow', 'feather'
+
+
+def get_extension(path):
+    return path.split('.')[-1].lower()
+
+
+def resolve_path(path) -> tuple[str, list[str]]:
+    """
+    Return the pattern to scan and the files it matches. `path` can be a
+    file, a glob pattern (`data/2024-*/*.parquet`) or a directory (all its
+    files, recursively).
+    """
+    if os.path.isdir(path):
+        files = sorted(
+            p for p in glob.glob(f'{path}/**/*', recursive=True)
+            if os.path.isfile(p) and get_extension(p) in OPEN_FUNCTIONS)
+        extensions = {get_extension(f) for f in files}
+        if len(extensions) == 1:
+            return f'{path}/**/*.{extensions.pop()}', files
+        return f'{path}/**/*', files
+    if not any(character in path for character in '*?['):
+        return path, [path]
+    files = sorted(
+        p for p in glob.glob(path, recursive=True) if os.path.isfile(p))
+    return path, files
 
 
 class LoadNode(BaseNode):
@@ -35,26 +78,83 @@ class LoadNode(BaseNode):
     def __init__(self, settings=None):
         settings[ATTR.CSV_SEPARATOR] = settings.get(ATTR.CSV_SEPARATOR) or ','
         super().__init__(settings)
+        # Last file read, reused while the file doesn't change
+        self._read_key = None
+        self._read_table: pl.LazyFrame = None
+        self._read_cache_paths = []
 
-    def _build_query(self, _):
+    def get_path(self):
         path = self[ATTR.PATH]
+        if not path:
+            return None
+        return os.path.expanduser(os.path.expandvars(path))
+
+    def get_source_paths(self):
+        path = self.get_path()
+        return resolve_path(path)[1] if path else []
+
+    def _build_query(self, _):
+        path = self.get_path()
         if not path:
             raise ValueError('Please specify a file path to open')
-        path = os.path.expanduser(os.path.expandvars(path))
 
-        extension = path.split('.')[-1]
-        open_func = OPEN_FUNCTIONS[extension]
+        pattern, files = resolve_path(path)
+        if not files:
+            raise FileNotFoundError(f'No file matches "{path}"')
+        extensions = sorted({get_extension(f) for f in files})
+        if len(extensions) > 1:
+            raise ValueError(
+                f'Several formats match "{path}" ({", ".join(extensions)}), '
+                'please use a pattern like "directory/**/*.parquet"')
+        extension = extensions[0]
+        if extension not in OPEN_FUNCTIONS:
+            raise ValueError(f'Format not covered: "{extension}"')
+
         kwargs = dict()
         if extension == 'csv':
             kwargs['separator'] = self[ATTR.CSV_SEPARATOR]
-
-        table: pl.DataFrame = open_func(path, **kwargs)
+        elif extension in ('xlsx', 'ods') and self[ATTR.SHEET]:
+            kwargs['sheet_name'] = self[ATTR.SHEET]
+        elif extension in HIVE_EXTENSIONS and self[ATTR.HIVE]:
+            kwargs['hive_partitioning'] = True
+
+        if extension in SCAN_FUNCTIONS:
+            # Readers expand the pattern themselves, and skip the files (or
+            # hive partitions) filtered out downstream
+            table: pl.LazyFrame = SCAN_FUNCTIONS[extension](pattern, **kwargs)
+        else:
+            table = self._read(extension, files, kwargs)
+
+        # Resolving the schema reads headers/metadata only, but raises
+        # missing file or parsing errors here, on the Load node
+        columns = table.collect_schema().names()
 
         prefix = self[ATTR.PREFIX]
         if prefix:
-            table = table.rename({c: f'{prefix}{c}' for c in table.columns})
-
-        self.tables[self.outputs[0]] = table.lazy()
+            table = table.rename({c: f'{prefix}{c}' for c in columns})
+
+        self.tables[self.outputs[0]] = table
+
+    def _read(self, extension, files, kwargs) -> pl.LazyFrame:
+        stats = []
+        for path in files:
+            stat = os.stat(path)
+            stats.append((path, stat.st_size, stat.st_mtime_ns))
+        key = stats, sorted(kwargs.items())
+        # Parsed files can be removed from the cache meanwhile
+        cached = all(os.path.exists(p) for p in self._read_cache_paths)
+        if key != self._read_key or not cached:
+            tables = [
+                cache.scan_source(path, READ_FUNCTIONS[extension], kwargs)
+                for path in files]
+            self._read_table = pl.concat(tables, how='diagonal_relaxed')
+            self._read_key = key
+            self._read_cache_paths = [
+                p for p in (
+                    cache.get_source_cache_path(path, kwargs)
+                    for path in files)
+                if p and os.path.exists(p)]
+        return self._read_table
 
 
 class LoadSettingsWidget(BaseSettingsWidget):
@@ -63,17 +163,29 @@ class LoadSettingsWidget(BaseSettingsWidget):
 
         # Widgets
         self.path_edit = QtWidgets.QLineEdit()
-        self.path_edit.editingFinished.connect(
-            lambda: self.line_edit_to_settings(self.path_edit, ATTR.PATH))
+        self.path_edit.editingFinished.connect(self._path_edited)
 
         self.browse_button = QtWidgets.QPushButton('Browse')
         self.browse_button.clicked.connect(self._browse)
 
+        self.files_label = QtWidgets.QLabel()
+
+        self.hive_cb = QtWidgets.QCheckBox('Hive partitioning')
+        self.hive_cb.setToolTip(
+            'Add columns from "key=value" directories (parquet, ipc)')
+        self.hive_cb.checkStateChanged.connect(
+            lambda: self.checkbox_to_settings(self.hive_cb, ATTR.HIVE))
+
         self.csv_separator_edit = QtWidgets.QLineEdit()
         self.csv_separator_edit.editingFinished.connect(
             lambda: self.line_edit_to_settings(
                 self.csv_separator_edit, ATTR.CSV_SEPARATOR))
 
+        self.sheet_edit = QtWidgets.QLineEdit()
+        self.sheet_edit.setPlaceholderText('first sheet')
+        self.sheet_edit.editingFinished.connect(
+            lambda: self.line_edit_to_settings(self.sheet_edit, ATTR.SHEET))
+
         self.prefix_edit = QtWidgets.QLineEdit()
         self.prefix_edit.editingFinished.connect(
             lambda: self.line_edit_to_settings(
@@ -84,7 +196,10 @@ class LoadSettingsWidget(BaseSettingsWidget):
         form_layout.addRow(ATTR.NAME.title(), self.name_edit)
         form_layout.addRow(ATTR.PATH.title(), self.path_edit)
         form_layout.addRow(' ', self.browse_button)
+        form_layout.addRow('Files', self.files_label)
+        form_layout.addRow(' ', self.hive_cb)
         form_layout.addRow('CSV Separator', self.csv_separator_edit)
+        form_layout.addRow('Sheet (xlsx, ods)', self.sheet_edit)
         form_layout.addRow('Columns prefix', self.prefix_edit)
 
         layout = QtWidgets.QVBoxLayout(self)
@@ -96,8 +211,27 @@ class LoadSettingsWidget(BaseSettingsWidget):
         self.name_edit.setText(node[ATTR.NAME])
         self.path_edit.setText(node[ATTR.PATH])
         self.csv_separator_edit.setText(node[ATTR.CSV_SEPARATOR] or ',')
+        self.sheet_edit.setText(node[ATTR.SHEET] or '')
         self.prefix_edit.setText(node[ATTR.PREFIX] or '')
+        self.hive_cb.setChecked(bool(node[ATTR.HIVE]))
         self.blockSignals(False)
+        self.update_files_label()
+
+    def update_files_label(self):
+        paths = self.node.get_source_paths()
+        stats = cache.get_files_stats(paths)
+        count = f'{len(paths)} file{"s" if len(paths) > 1 else ""}'
+        if not paths:
+            self.files_label.setText('no file')
+        elif stats is None:
+            self.files_label.setText(f'{count} (missing)')
+        else:
+            size = format_size(sum(stat[1] for stat in stats))
+            self.files_label.setText(f'{count}, {size}')
+
+    def _path_edited(self):
+        self.line_edit_to_settings(self.path_edit, ATTR.PATH)
+        self.update_files_label()
 
     def _browse(self):
         filepath, _ = QtWidgets.QFileDialog.getOpenFileName(
@@ -105,4 +239,4 @@ class LoadSettingsWidget(BaseSettingsWidget):
         if not filepath:
             return
         self.path_edit.setText(filepath)
-        self.line_edit_to_settings(self.path_edit, ATTR.PATH)
+        self._path_edited()
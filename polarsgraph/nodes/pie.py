@@ -5,7 +5,8 @@ from PySide6.QtCore import Qt
 from polarsgraph.nodes import GREEN as DEFAULT_COLOR
 from polarsgraph.graph import DISPLAY_CATEGORY
 from polarsgraph.nodes.base import (
-    DISPLAY_INDEX_ATTR, BaseNode, BaseSettingsWidget, BaseDisplay)
+    DISPLAY_INDEX_ATTR, TOP_ROWS_ATTR, BaseNode, BaseSettingsWidget,
+    BaseDisplay, fold_top_rows)
 
 
 COLOR = dict(
@@ -19,6 +20,7 @@ class ATTR:
     NAME = 'name'
     TITLE = 'title'
     DISPLAY_INDEX = DISPLAY_INDEX_ATTR
+    TOP_ROWS = TOP_ROWS_ATTR
     START_ANGLE = 'start_angle'
     END_ANGLE = 'end_angle'
 
@@ -34,13 +36,18 @@ class PieNode(BaseNode):
         super().__init__(settings)
 
         self._display_widget = None
+        self.display_query: pl.LazyFrame = None
 
     def _build_query(self, tables):
         self.tables['table'] = tables[0]
-        # Update display
-        if not self.display_widget:
-            return
-        self.display_widget.set_table(tables[0])
+        self.display_query = tables[0]
+        if self[ATTR.TOP_ROWS]:
+            # Only the labels and values columns are shown
+            self.display_query = fold_top_rows(
+                tables[0].select(pl.nth(0, 1)), self[ATTR.TOP_ROWS])
+
+    def set_result(self, df: pl.DataFrame):
+        self.display_widget.set_table(df)
 
     def clear(self):
         pass
@@ -77,6 +84,14 @@ class PieSettingsWidget(BaseSettingsWidget):
             lambda: self.line_edit_to_settings(
                 self.end_angle_edit, ATTR.END_ANGLE, int))
 
+        self.top_rows_spinbox = QtWidgets.QSpinBox(
+            maximum=999, specialValueText='all')
+        self.top_rows_spinbox.setToolTip(
+            'Show the biggest slices only, the others are summed')
+        self.top_rows_spinbox.valueChanged.connect(
+            lambda: self.spinbox_to_settings(
+                self.top_rows_spinbox, ATTR.TOP_ROWS))
+
         # Layout
         form_layout = QtWidgets.QFormLayout()
         form_layout.addRow(ATTR.NAME.title(), self.name_edit)
@@ -84,6 +99,7 @@ class PieSettingsWidget(BaseSettingsWidget):
         form_layout.addRow(ATTR.TITLE.title(), self.title_edit)
         form_layout.addRow('Start angle', self.start_angle_edit)
         form_layout.addRow('End angle', self.end_angle_edit)
+        form_layout.addRow('Top slices', self.top_rows_spinbox)
         layout = QtWidgets.QVBoxLayout(self)
         layout.addLayout(form_layout)
 
@@ -94,6 +110,7 @@ class PieSettingsWidget(BaseSettingsWidget):
         self.title_edit.setText(node[ATTR.TITLE] or '')
         self.start_angle_edit.setText(str(node[ATTR.START_ANGLE] or 0))
         self.end_angle_edit.setText(str(node[ATTR.END_ANGLE] or 360))
+        self.top_rows_spinbox.setValue(node[ATTR.TOP_ROWS] or 0)
         self.blockSignals(False)
 
 
@@ -115,10 +132,7 @@ class PieDisplay(BaseDisplay):
         layout.addWidget(self.chart_view)
         layout.addWidget(self.error_label)
 
-    def set_table(self, table: pl.LazyFrame):
-        if table is None:
-            return
-        table = table.collect()
+    def set_table(self, table: pl.DataFrame):
         title = self.node[ATTR.TITLE] or self.node[ATTR.NAME]
         start_angle = self.node[ATTR.START_ANGLE] or 0
         end_angle = self.node[ATTR.END_ANGLE] or 360
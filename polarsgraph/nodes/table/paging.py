@@ -0,0 +1,81 @@
+"""
+Display big tables without collecting them: rows are fetched by blocks with
+`LazyFrame.slice()` when they are painted, and the most recently used blocks
+are kept in memory.
+
+Queries which would be recomputed entirely for each block (sort, join,
+filter...) are collected once instead.
+"""
+import re
+from collections import OrderedDict
+
+import polars as pl
+
+
+BLOCK_SIZE = 1000  # rows
+MAX_BLOCKS = 64  # blocks kept in memory
+MINIMUM_PAGED_HEIGHT = 10 * BLOCK_SIZE  # smaller tables are collected
+
+# Operations needing the whole table to produce any row
+EXPENSIVE_OPERATIONS = re.compile(
+    r'SORT|JOIN|AGGREGATE|FILTER|UNIQUE|PIVOT|\.over\(|\.rank\(|\.sort')
+
+
+class PagedTable:
+    def __init__(self, query: pl.LazyFrame, height: int):
+        self.query = query
+        self.height = height
+        self.schema = query.collect_schema()
+        self.columns = self.schema.names()
+        self.blocks: OrderedDict[int, pl.DataFrame] = OrderedDict()
+
+    def get_block(self, index) -> pl.DataFrame:
+        if index in self.blocks:
+            self.blocks.move_to_end(index)
+            return self.blocks[index]
+        block = self.query.slice(index * BLOCK_SIZE, BLOCK_SIZE).collect()
+        self.blocks[index] = block
+        if len(self.blocks) > MAX_BLOCKS:
+            self.blocks.popitem(last=False)
+        return block
+
+    def estimated_size(self):
+        """
+        Size of the fetched rows.
+        """
+        return sum(block.estimated_size() for block in self.blocks.values())
+
+    def collect(self) -> pl.DataFrame:
+        """
+        Materialize the whole table (e.g. to export it).
+        """
+        return self.query.collect()
+
+
+def is_pageable(query: pl.LazyFrame):
+    try:
+        plan = query.explain(optimized=False)
+    except BaseException:
+        return False
+    return not EXPENSIVE_OPERATIONS.search(plan)
+
+
+def fetch(query: pl.LazyFrame, collect) -> pl.DataFrame | PagedTable:
+    """
+    Return a PagedTable if the query is cheap to slice and the table big
+    enough, otherwise the result of `collect(query)`.
+    """
+    if not is_pageable(query):
+        return collect(query)
+    height = query.select(pl.len()).collect().item()
+    if height < MINIMUM_PAGED_HEIGHT:
+        return collect(query)
+    table = PagedTable(query, height)
+    table.get_block(0)  # first rows are needed right away
+    return table
+
+
+def materialize(table: pl.DataFrame | PagedTable) -> pl.DataFrame:
+    if isinstance(table, PagedTable):
+        return table.collect()
+    return table
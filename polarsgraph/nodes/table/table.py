@@ -7,13 +7,19 @@ CSV Example:
 The `format` node does this but it can be implemented with new nodes
 """
 
+import time
+from functools import partial
+
 import polars as pl
+import polars.selectors as cs
 from PySide6 import QtWidgets
 
+from polarsgraph import profiler
 from polarsgraph.graph import DISPLAY_CATEGORY
 from polarsgraph.nodes import GREEN as DEFAULT_COLOR
 from polarsgraph.nodes.base import BaseNode, BaseSettingsWidget
 
+from polarsgraph.nodes.table import paging
 from polarsgraph.nodes.table.tablewidget import ATTR, TableDisplay
 
 
@@ -28,16 +34,36 @@ class TableNode(BaseNode):
         super().__init__(settings)
 
         self._display_widget = None
+        self.display_query: pl.LazyFrame = None
 
     def _build_query(self, tables):
         df: pl.LazyFrame = tables[0]
         if df is None:
-            return self.clear()
-
-        # Update display
-        if not self.display_widget:
+            self.display_query = pl.LazyFrame()
             return
-        self.display_widget.set_table(df.collect())
+
+        # Round
+        round_digits = self[ATTR.ROUND_FLOATS_DIGITS]
+        if round_digits:
+            df = df.with_columns(cs.float().round(round_digits))
+
+        self.display_query = df
+
+    def get_fetch_query(self, df: pl.LazyFrame):
+        if paging.is_pageable(df):
+            return None  # may be fetched by blocks, see `fetch`
+        return df
+
+    def fetch(self, df: pl.LazyFrame, context: str):
+        start = time.perf_counter()
+        result = paging.fetch(df, partial(self.collect, context=context))
+        if isinstance(result, paging.PagedTable):  # not profiled by collect
+            profiler.record_collect(
+                self['name'], time.perf_counter() - start, result)
+        return result
+
+    def set_result(self, df: pl.DataFrame | paging.PagedTable):
+        self.display_widget.set_table(df)
 
     def clear(self):
         self.display_widget.set_table(pl.DataFrame())
@@ -1,11 +1,21 @@
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+from collections import OrderedDict
+
 import polars as pl
 from PySide6 import QtWidgets, QtGui, QtCore
 from PySide6.QtCore import Qt
 
+from polarsgraph.nodes.table.paging import BLOCK_SIZE, MAX_BLOCKS, PagedTable
+
 
 DEFAULT_COL_WIDTH = 80
 MINIMUM_COL_WIDTH = 24
 AUTO_SIZE_MARGIN = 16
+CHUNK_SIZE = BLOCK_SIZE  # rows converted to Python at once, when painted
+MAX_CHUNKS = MAX_BLOCKS  # converted chunks kept, like the paged blocks
+WIDEST_CANDIDATES = 10  # longest strings measured to fit columns contents
+SAMPLE_SIZE = 10_000  # rows converted by Python to find the longest strings
 
 BGCOLOR_COLUMN_SUFFIX = '~color'
 BLACK = QtGui.QColor('black')
@@ -35,8 +45,17 @@ class Tableau(QtWidgets.QWidget):
 
         self.column_sizes: dict = {}
         self._column_sizes: list = []
-
-        self.df: pl.DataFrame
+        self._columns_offsets: list = [0]  # cumulated columns widths
+
+        self.df: pl.DataFrame | PagedTable
+        # Cells strings and colors, by chunk index then column index. Least
+        # recently painted chunks are dropped
+        self._strings_chunks: OrderedDict[int, dict[int, list[str]]] = (
+            OrderedDict())
+        self._colors_chunks: OrderedDict[int, dict[int, list[tuple]]] = (
+            OrderedDict())
+        # Contents widths by (column index, font size)
+        self._contents_widths: dict[tuple[int, int], int] = {}
         self.set_table(table)
 
         self.TEXT_COLOR: QtGui.QColor
@@ -95,7 +114,7 @@ class Tableau(QtWidgets.QWidget):
         self.update()
 
     def _get_column_x(self, column_index, viewport_width):
-        x = self.vertical_header_width + sum(self._column_sizes[:column_index])
+        x = self.vertical_header_width + self._columns_offsets[column_index]
 
         # if not frozen, offset by scroll:
         if column_index >= self.frozen_columns:
@@ -123,14 +142,73 @@ class Tableau(QtWidgets.QWidget):
 
         return y
 
+    def _get_visible_rows(self, viewport_height):
+        """
+        Indexes of the rows to paint: frozen rows and rows in the viewport.
+        """
+        scroll = self._vertical_scroll - self.horizontal_header_height
+        first = max(self.frozen_rows, scroll // self.row_height - 1)
+        last = min(
+            self.row_count, (scroll + viewport_height) // self.row_height + 2)
+        frozen = min(self.frozen_rows, self.row_count)
+        candidates = [*range(frozen), *range(first, last)]
+        return [
+            i for i in candidates
+            if self._get_row_y(i, viewport_height) is not None]
+
+    def _get_visible_columns(self, viewport_width):
+        """
+        Indexes of the columns to paint: frozen columns and columns in the
+        viewport.
+        """
+        scroll = self._horizontal_scroll - self.vertical_header_width
+        offsets = self._columns_offsets
+        first = max(self.frozen_columns, bisect_left(offsets, scroll) - 1)
+        last = min(
+            self.column_count, bisect_right(offsets, scroll + viewport_width))
+        frozen = min(self.frozen_columns, self.column_count)
+        candidates = [*range(frozen), *range(first, last)]
+        return [
+            i for i in candidates
+            if self._get_column_x(i, viewport_width) is not None]
+
+    def _get_column_chunk(self, col_index, chunk_index) -> pl.Series:
+        if isinstance(self.df, PagedTable):
+            return self.df.get_block(chunk_index).to_series(col_index)
+        return self.df.to_series(col_index).slice(
+            chunk_index * CHUNK_SIZE, CHUNK_SIZE)
+
+    def _get_cached_chunk(self, chunks: OrderedDict, chunk_index) -> dict:
+        if chunk_index in chunks:
+            chunks.move_to_end(chunk_index)
+            return chunks[chunk_index]
+        chunks[chunk_index] = {}
+        if len(chunks) > MAX_CHUNKS:
+            chunks.popitem(last=False)
+        return chunks[chunk_index]
+
+    def _get_strings_chunk(self, col_index, chunk_index):
+        columns = self._get_cached_chunk(self._strings_chunks, chunk_index)
+        if col_index not in columns:
+            series = self._get_column_chunk(col_index, chunk_index)
+            columns[col_index] = series_to_strings(series)
+        return columns[col_index]
+
+    def _get_colors_chunk(self, col_index, chunk_index):
+        columns = self._get_cached_chunk(self._colors_chunks, chunk_index)
+        if col_index not in columns:
+            values = self._get_column_chunk(col_index, chunk_index).to_list()
+            colors = {value: parse_color(value) for value in set(values)}
+            columns[col_index] = [colors[value] for value in values]
+        return columns[col_index]
+
     def _get_cell_colors(self, row, col):
         color_col = self.bgcolor_column_indexes.get(col)
         if color_col:
-            color = self.df[row, color_col]
-            if color:
-                bg_color = QtGui.QColor(color)
-                text_color = WHITE if bg_color.valueF() < .5 else BLACK
-                return bg_color, text_color
+            chunk_index, index = divmod(row, CHUNK_SIZE)
+            colors = self._get_colors_chunk(color_col, chunk_index)[index]
+            if colors:
+                return colors
         return self.BACKGROUND_COLOR, self.TEXT_COLOR
 
     def _paint(self, painter: QtGui.QPainter):
@@ -139,6 +217,7 @@ class Tableau(QtWidgets.QWidget):
         self._column_sizes = [
             self.column_sizes.get(colname, DEFAULT_COL_WIDTH)
             for colname in self.columns]
+        self._columns_offsets = [0, *accumulate(self._column_sizes)]
 
         rect = self.rect()
         widget_width, widget_height = rect.size().toTuple()
@@ -150,22 +229,19 @@ class Tableau(QtWidgets.QWidget):
         if self.df is None or not self.columns:
             return
 
-        # Paint cells
-        columns_widths = []
-        rows_y = dict()  # cache values for headers
-        columns_x = dict()  # cache values for headers
-        for col_index, colname in reversed(list(enumerate(self.columns))):
+        # Paint visible cells only. Reversed, so frozen cells are on top
+        rows_y = {  # cache values for headers
+            row_index: self._get_row_y(row_index, widget_height)
+            for row_index in self._get_visible_rows(widget_height)}
+        columns_x = {  # cache values for headers
+            col_index: self._get_column_x(col_index, widget_width)
+            for col_index in self._get_visible_columns(widget_width)}
+        for col_index in reversed(columns_x):
             col_width = self._column_sizes[col_index]
-            x = self._get_column_x(col_index, widget_width)
-            if x is None:
-                continue
-            columns_x[col_index] = x
-            for row_index in reversed(range(self.row_count)):
+            x = columns_x[col_index]
+            for row_index in reversed(rows_y):
                 # Rect
-                y = self._get_row_y(row_index, widget_height)
-                if y is None:
-                    continue
-                rows_y[row_index] = y
+                y = rows_y[row_index]
                 r = QtCore.QRect(x, y, col_width, self.row_height)
                 # Background
                 bg_color, text_color = self._get_cell_colors(
@@ -185,7 +261,6 @@ class Tableau(QtWidgets.QWidget):
                 painter.setPen(self.GRID_COLOR)
                 painter.drawLine(
                     x, y + self.row_height, x + col_width, y + self.row_height)
-            columns_widths.append(col_width)
 
         # horizontal header
         r = QtCore.QRect(rect)
@@ -197,10 +272,9 @@ class Tableau(QtWidgets.QWidget):
         self.columns_separators.clear()
         separator_vertical_margin = 4
         separator_selection_margin = 4
-        for col_index, colname in reversed(list(enumerate(self.columns))):
+        for col_index in reversed(columns_x):
             # Rect
-            if col_index not in columns_x:
-                continue
+            colname = self.columns[col_index]
             x = columns_x[col_index]
             col_width = self.column_sizes.get(colname, DEFAULT_COL_WIDTH)
             r = QtCore.QRect(x, 0, col_width, self.horizontal_header_height)
@@ -224,7 +298,7 @@ class Tableau(QtWidgets.QWidget):
                 self.horizontal_header_height)
             self.columns_separators[col_index] = selection_rect
             # Frozen columns separator
-            if col_index == self.frozen_columns - 1:
+            if col_index == self.frozen_columns - 1 and rows_y:
                 painter.setPen(self.GRID_COLOR)
                 y = max(rows_y.values()) + self.row_height
                 x += self._column_sizes[col_index]
@@ -237,10 +311,8 @@ class Tableau(QtWidgets.QWidget):
         painter.setBrush(self.HEADER_COLOR)
         painter.drawRect(r)
 
-        for row_index in reversed(range(self.row_count)):
+        for row_index in reversed(rows_y):
             # Rect
-            if row_index not in rows_y:
-                continue
             value = row_index - self.row_number_offset + 1
             if value < 1:
                 continue
@@ -265,10 +337,8 @@ class Tableau(QtWidgets.QWidget):
         painter.drawRect(0, 0, self.vertical_header_width, corner_height)
 
     def get_cell_string(self, row_index, col_index):
-        value = self.df[row_index, col_index]
-        if value is None:
-            return ''
-        return str(value)
+        chunk_index, index = divmod(row_index, CHUNK_SIZE)
+        return self._get_strings_chunk(col_index, chunk_index)[index]
 
     def get_separator_column_under_cursor(self, pos) -> str:
         for i, rect in self.columns_separators.items():
@@ -317,9 +387,12 @@ class Tableau(QtWidgets.QWidget):
             self._column_resized = False
         return super().mouseReleaseEvent(event)
 
-    def set_table(self, table: pl.DataFrame):
+    def set_table(self, table: pl.DataFrame | PagedTable):
         table = table if table is not None else pl.DataFrame()
         self.df = table
+        self._strings_chunks.clear()
+        self._colors_chunks.clear()
+        self._contents_widths.clear()
         if table is None:
             self.column_count = 0
             self.row_count = 0
@@ -336,16 +409,30 @@ class Tableau(QtWidgets.QWidget):
             columns.index(c): index_or_none(columns, get_bgcolor_name(c))
             for c in columns}
 
+    def _get_column_values(self, col_index) -> pl.Series:
+        if isinstance(self.df, PagedTable):  # don't fetch all rows
+            blocks = list(self.df.blocks.values()) or [self.df.get_block(0)]
+            return pl.concat([block.to_series(col_index) for block in blocks])
+        return self.df.to_series(col_index)
+
+    def get_column_contents_width(self, col_index):
+        """
+        Only the longest strings of the column are measured.
+        """
+        key = col_index, self.font_.pointSize()
+        if key not in self._contents_widths:
+            strings = [
+                self.columns[col_index],
+                *get_longest_strings(self._get_column_values(col_index))]
+            self._contents_widths[key] = max(
+                self.metrics.boundingRect(s).width() for s in strings)
+        return self._contents_widths[key]
+
     def resize_columns_to_contents(self):
         sizes = dict()
         for col_index, col_name in enumerate(self.columns):
-            max_cell_width = max([
-                self.metrics.boundingRect(
-                    self.get_cell_string(row, col_index)).width()
-                for row in range(self.row_count)])
-            sizes[col_name] = max([
-                self.metrics.boundingRect(col_name).width(),
-                max_cell_width]) + AUTO_SIZE_MARGIN
+            sizes[col_name] = (
+                self.get_column_contents_width(col_index) + AUTO_SIZE_MARGIN)
         self.set_column_sizes(sizes)
 
     def set_column_sizes(self, column_sizes):
@@ -487,9 +574,57 @@ def get_bgcolor_name(column):
     return f'{column}{BGCOLOR_COLUMN_SUFFIX}'
 
 
+def series_to_strings(series: pl.Series) -> list[str]:
+    """
+    Cast numbers and strings with Polars, other types (dates, lists...)
+    with Python to keep their usual representation.
+    """
+    if series.dtype.is_numeric() or series.dtype == pl.String:
+        return series.cast(pl.String).fill_null('').to_list()
+    return [
+        '' if value is None else str(value) for value in series.to_list()]
+
+
+def get_longest_strings(
+        series: pl.Series, count=WIDEST_CANDIDATES) -> list[str]:
+    """
+    Strings with the most characters, as the widest ones are very likely
+    among them. Types converted by Python are sampled.
+    """
+    if series.dtype.is_numeric() or series.dtype == pl.String:
+        strings = series.cast(pl.String).fill_null('')
+    else:
+        if len(series) > SAMPLE_SIZE:
+            series = series.sample(SAMPLE_SIZE, seed=0)
+        strings = pl.Series(series_to_strings(series), dtype=pl.String)
+    df = pl.DataFrame({'string': strings, 'length': strings.str.len_chars()})
+    return df.top_k(count, by='length')['string'].to_list()
+
+
+def parse_color(color: str):
+    """
+    Return background and text colors, or None if there is no color.
+    """
+    if not color:
+        return None
+    bg_color = QtGui.QColor(color)
+    text_color = WHITE if bg_color.valueF() < .5 else BLACK
+    return bg_color, text_color
+
+
 if __name__ == '__main__':
     import os
     app = QtWidgets.QApplication([])
+
+    # Frozen rows and columns above the table size
+    tableau = TableauWithScroll(pl.DataFrame({'a': [1], 'b': [2]}))
+    tableau.set_frozen_columns(4)
+    tableau.set_frozen_rows(3)
+    tableau.resize(400, 300)
+    assert not tableau.grab().isNull()
+    assert tableau.tableau._get_visible_rows(300) == [0]
+    assert tableau.tableau._get_visible_columns(400) == [0, 1]
+
     df = pl.read_ods(os.path.expandvars('$SAMPLES/sample.ods'))
     tableau = TableauWithScroll(df)
     tableau.set_column_sizes(dict(z=30))
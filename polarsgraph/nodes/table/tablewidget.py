@@ -6,6 +6,7 @@ from PySide6.QtCore import Qt
 
 from polarsgraph.log import logger
 from polarsgraph.nodes.base import DISPLAY_INDEX_ATTR, BaseNode, BaseDisplay
+from polarsgraph.nodes.table.paging import PagedTable, materialize
 from polarsgraph.nodes.table.tableau import TableauWithScroll
 
 
@@ -74,24 +75,19 @@ class TableDisplay(BaseDisplay):
         layout.addWidget(self.tableau)
         layout.addWidget(self.bottom_widget)
 
-    def set_table(self, table: pl.DataFrame):
+    def set_table(self, table: pl.DataFrame | PagedTable):
+        """
+        Floats are rounded by the node query.
+        """
         if table is None:
             self.table_details_label.setText('')
             return self.tableau.set_table(pl.DataFrame())
         columns_count = len(table.columns)
 
-        # Round
-        round_digits = self.node[ATTR.ROUND_FLOATS_DIGITS]
-        if round_digits:
-            float_cols = [
-                name for name, dtype in table.schema.items()
-                if dtype.is_float()]
-            table = table.with_columns([
-                pl.col(col).round(round_digits) for col in float_cols])
-
         # Label
+        preview = ' (preview)' if self.node.preview else ''
         self.table_details_label.setText(
-            f'{table.height} x {columns_count}')
+            f'{table.height} x {columns_count}{preview}')
 
         # New widget
         self.tableau.set_table(table)
@@ -103,12 +99,23 @@ class TableDisplay(BaseDisplay):
     def set_board_mode(self, board_enabled: bool):
         self.bottom_widget.setVisible(not board_enabled)
 
+    def set_busy(self, busy: bool):
+        super().set_busy(busy)
+        if busy:
+            self.table_details_label.setText('computing...')
+
     def export_dataframe(self):
         if self.tableau.tableau.df is None:
             return QtWidgets.QMessageBox.warning(
                 self, 'Empty', 'No Table to export',
                 QtWidgets.QMessageBox.Ok)
-        prompt_save_df(self.tableau.tableau.df, self)
+        prompt_save_df(self.get_dataframe(), self)
+
+    def get_dataframe(self) -> pl.DataFrame:
+        """
+        Whole table, even if only the painted rows were fetched.
+        """
+        return materialize(self.tableau.tableau.df)
 
     def get_pixmap(self):
         size = self.tableau.tableau.size()
@@ -127,14 +134,14 @@ class TableDisplay(BaseDisplay):
         QtWidgets.QApplication.clipboard().setPixmap(self.get_pixmap())
 
     def csv_to_clipboard(self):
-        df = get_table_without_color_columns(self.tableau.tableau.df)
+        df = get_table_without_color_columns(self.get_dataframe())
         string = '\t'.join(df.columns)
         for row in df.to_dicts():
             string += '\n' + '\t'.join(str(v) for v in row.values())
         QtWidgets.QApplication.clipboard().setText(string)
 
     def ascii_to_clipboard(self):
-        df = get_table_without_color_columns(self.tableau.tableau.df)
+        df = get_table_without_color_columns(self.get_dataframe())
         settings = {
             'POLARS_FMT_MAX_ROWS': '300',
             'POLARS_FMT_MAX_COLS': '50',
@@ -0,0 +1,69 @@
+"""
+Available node types. Importing them doesn't require a QApplication.
+"""
+from polarsgraph.nodes.dot import DotNode, DotSettingsWidget
+from polarsgraph.nodes.load import LoadNode, LoadSettingsWidget
+from polarsgraph.nodes.sort import SortNode, SortSettingsWidget
+from polarsgraph.nodes.join import JoinNode, JoinSettingsWidget
+from polarsgraph.nodes.group import GroupNode, GroupSettingsWidget
+from polarsgraph.nodes.pivot import PivotNode, PivotSettingsWidget
+from polarsgraph.nodes.derive import DeriveNode, DeriveSettingsWidget
+from polarsgraph.nodes.filter import FilterNode, FilterSettingsWidget
+from polarsgraph.nodes.format import FormatNode, FormatSettingsWidget
+from polarsgraph.nodes.rename import RenameNode, RenameSettingsWidget
+from polarsgraph.nodes.switch import SwitchNode, SwitchSettingsWidget
+from polarsgraph.nodes.reorder import ReorderNode, ReorderSettingsWidget
+from polarsgraph.nodes.backdrop import BackdropNode, BackdropSettingsWidget
+from polarsgraph.nodes.constant import (
+    ConstantNode, ConstantSettingsWidget)
+from polarsgraph.nodes.sql import SQLNode, SqlSettingsWidget
+from polarsgraph.nodes.concatenate import (
+    ConcatenateNode, ConcatenateSettingsWidget)
+
+from polarsgraph.nodes.table import (
+    TableNode, TableSettingsWidget)
+from polarsgraph.nodes.bars import (
+    BarsNode, BarsSettingsWidget)
+from polarsgraph.nodes.pie import (
+    PieNode, PieSettingsWidget)
+from polarsgraph.nodes.lines import (
+    LinesNode, LinesSettingsWidget)
+from polarsgraph.nodes.label import (
+    LabelNode, LabelSettingsWidget)
+from polarsgraph.nodes.dashboard import (
+    DashboardNode, DashboardSettingsWidget)
+
+
+types = {
+    LoadNode.type: {'type': LoadNode, 'widget': LoadSettingsWidget},
+    # Manipulators
+    SortNode.type: {'type': SortNode, 'widget': SortSettingsWidget},
+    JoinNode.type: {'type': JoinNode, 'widget': JoinSettingsWidget},
+    PivotNode.type: {'type': PivotNode, 'widget': PivotSettingsWidget},
+    GroupNode.type: {'type': GroupNode, 'widget': GroupSettingsWidget},
+    DeriveNode.type: {'type': DeriveNode, 'widget': DeriveSettingsWidget},
+    FilterNode.type: {'type': FilterNode, 'widget': FilterSettingsWidget},
+    FormatNode.type: {'type': FormatNode, 'widget': FormatSettingsWidget},
+    RenameNode.type: {'type': RenameNode, 'widget': RenameSettingsWidget},
+    ReorderNode.type: {'type': ReorderNode, 'widget': ReorderSettingsWidget},
+    SwitchNode.type: {'type': SwitchNode, 'widget': SwitchSettingsWidget},
+    ConcatenateNode.type: {
+        'type': ConcatenateNode, 'widget': ConcatenateSettingsWidget},
+    ConstantNode.type: {
+        'type': ConstantNode, 'widget': ConstantSettingsWidget},
+    SQLNode.type: {'type': SQLNode, 'widget': SqlSettingsWidget},
+    # Displays
+    PieNode.type: {'type': PieNode, 'widget': PieSettingsWidget},
+    BarsNode.type: {'type': BarsNode, 'widget': BarsSettingsWidget},
+    LabelNode.type: {'type': LabelNode, 'widget': LabelSettingsWidget},
+    LinesNode.type: {'type': LinesNode, 'widget': LinesSettingsWidget},
+    TableNode.type: {'type': TableNode, 'widget': TableSettingsWidget},
+    # Dashboard
+    DashboardNode.type: {
+        'type': DashboardNode, 'widget': DashboardSettingsWidget},
+    # Backdrop
+    BackdropNode.type: {
+        'type': BackdropNode, 'widget': BackdropSettingsWidget},
+    # Dot
+    DotNode.type: {'type': DotNode, 'widget': DotSettingsWidget},
+}
@@ -1,6 +1,7 @@
 from PySide6 import QtWidgets, QtGui, QtCore
 from PySide6.QtCore import Qt
 
+from polarsgraph import profiler
 from polarsgraph.graph import (
     LOAD_CATEGORY, MANIPULATE_CATEGORY, DISPLAY_CATEGORY, DASHBOARD_CATEGORY,
     BACKDROP_CATEGORY,
@@ -55,6 +56,7 @@ class NodeView(QtWidgets.QWidget):
         self.connections_paths: dict[tuple, QtGui.QPainterPath] = dict()
 
         self.selected_names = []
+        self.show_profiles = False
 
         self.clicked_button = None
         self.previous_pan_pos = None
@@ -135,14 +137,19 @@ class NodeView(QtWidgets.QWidget):
         # Draw nodes
         display_indexes = {
             i: d for d, i in get_displays_by_index(self.graph).items()}
+        max_duration = (
+            profiler.get_max_duration(self.graph) if self.show_profiles
+            else None)
         for name in sorted(list(self.graph)):
             node = self.graph[name]
             if node.category == BACKDROP_CATEGORY:
                 continue
             index = display_indexes.get(name, '')
+            profile = (
+                profiler.get_profile(name) if self.show_profiles else None)
             self.plugs_bboxes[name], self.nodes_bboxes[name] = paint_node(
                 painter, self.viewportmapper, node, index,
-                name in self.selected_names)
+                name in self.selected_names, profile, max_duration)
 
         # Draw connections
         painter.setBrush(Qt.BrushStyle.NoBrush)
@@ -523,7 +530,9 @@ def paint_node(
         viewportmapper: ViewportMapper,
         node: BaseNode,
         display_index: int,
-        selected: bool):
+        selected: bool,
+        profile: dict = None,
+        max_duration: float = None):
     name = node['name']
     pos = node['position']
     if node.inputs == DYNAMIC_PLUG_COUNT:
@@ -638,10 +647,41 @@ def paint_node(
         painter.setPen(QtGui.QPen(Qt.red, thickness * 4))
         painter.drawLine(rect.bottomLeft(), rect.topRight())
 
+    # Draw timings
+    if profile:
+        paint_profile(painter, viewportmapper, rect, profile, max_duration)
+
     rect.adjust(-plug_radius, 0, plug_radius, 0)  # BBOX including plugs
     return (input_coords, output_coords), rect
 
 
+def paint_profile(
+        painter: QtGui.QPainter,
+        viewportmapper: ViewportMapper,
+        node_rect: QtCore.QRectF,
+        profile: dict,
+        max_duration: float):
+    """
+    Badge under the node, from green (fast) to red (slowest node).
+    """
+    duration = profiler.get_duration(profile)
+    ratio = duration / max_duration if max_duration else 0
+    color = QtGui.QColor.fromHsvF((1 - ratio) / 3, .8, .8)
+    rect = QtCore.QRectF(
+        node_rect.left(),
+        node_rect.bottom() + viewportmapper.to_viewport(3),
+        node_rect.width(),
+        viewportmapper.to_viewport(16))
+    round_size = viewportmapper.to_viewport(3)
+    painter.setPen(Qt.PenStyle.NoPen)
+    painter.setBrush(color)
+    painter.drawRoundedRect(rect, round_size, round_size)
+    painter.setPen(QtGui.QPen(Qt.black, viewportmapper.to_viewport(1)))
+    painter.setFont(QtGui.QFont('Verdana', viewportmapper.to_viewport(7)))
+    painter.drawText(
+        rect, Qt.AlignmentFlag.AlignCenter, profiler.format_profile(profile))
+
+
 def paint_backdrop(
         painter: QtGui.QPainter,
         viewportmapper: ViewportMapper,
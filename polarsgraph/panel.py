@@ -5,6 +5,7 @@ import polars as pl
 from PySide6 import QtWidgets, QtGui, QtCore
 from PySide6.QtCore import Qt
 
+from polarsgraph.plan import PlanInspector
 from polarsgraph.nodes.base import BaseNode, BaseSettingsWidget
 from polarsgraph.serialize import deserialize_node
 
@@ -19,6 +20,7 @@ EXPRESSIONS_COLORS = {
 class SettingsWidget(QtWidgets.QWidget):
     settings_changed = QtCore.Signal(str)
     rename_asked = QtCore.Signal(str, str)
+    plan_asked = QtCore.Signal(str)
 
     def __init__(self, types):
         super().__init__()
@@ -51,6 +53,8 @@ class SettingsWidget(QtWidgets.QWidget):
         self.errors_browser.setFont(fixed_font)
         self.errors_browser.setWindowTitle('Node Error')
 
+        self.plan_inspector = PlanInspector(fixed_font, self)
+
         icon = QtGui.QIcon.fromTheme(QtGui.QIcon.ThemeIcon.HelpAbout)
         serialized_settings_button = QtWidgets.QPushButton(
             '  show settings', icon=icon)
@@ -61,6 +65,10 @@ class SettingsWidget(QtWidgets.QWidget):
             '  show error', icon=icon)
         errors_button.clicked.connect(self.show_error)
 
+        icon = QtGui.QIcon.fromTheme(QtGui.QIcon.ThemeIcon.EditFind)
+        plan_button = QtWidgets.QPushButton('  show plan', icon=icon)
+        plan_button.clicked.connect(self.show_plan)
+
         # Layout
         self.node_layout = QtWidgets.QVBoxLayout()
         for typename, config in self.types.items():
@@ -75,6 +83,7 @@ class SettingsWidget(QtWidgets.QWidget):
         buttons_layout = QtWidgets.QHBoxLayout()
         buttons_layout.addWidget(serialized_settings_button)
         buttons_layout.addWidget(errors_button)
+        buttons_layout.addWidget(plan_button)
         buttons_layout.addStretch()
 
         type_layout = QtWidgets.QHBoxLayout()
@@ -117,6 +126,10 @@ class SettingsWidget(QtWidgets.QWidget):
             self.errors_browser.setHtml(format_error(self.node.error))
         self.errors_browser.show()
 
+    def show_plan(self):
+        if self.node:
+            self.plan_asked.emit(self.node['name'])
+
     def clear(self):
         self.settings_edit.clear()
 
@@ -0,0 +1,129 @@
+"""
+Show the query plans of a node table, to check what Polars optimizes
+(e.g. if filters and selections are pushed down to the Load nodes), and
+the timings of each operation.
+"""
+from functools import partial
+
+import polars as pl
+from PySide6 import QtWidgets
+from PySide6.QtCore import Qt
+
+from polarsgraph.graph import (
+    LOAD_CATEGORY, MANIPULATE_CATEGORY, DISPLAY_CATEGORY, BaseNode,
+    get_input_tables)
+from polarsgraph.executor import get_executor
+from polarsgraph.nodes.table.tableau import TableauWithScroll
+
+
+def get_node_table(graph, node: BaseNode) -> pl.LazyFrame | None:
+    """
+    Output table of the node, or input table of displays.
+    """
+    if node.category in (LOAD_CATEGORY, MANIPULATE_CATEGORY):
+        return node.tables.get(node.outputs[0])
+    if node.category == DISPLAY_CATEGORY:
+        return get_input_tables(graph, node)[0]
+
+
+def get_plan(df: pl.LazyFrame, optimized: bool):
+    try:
+        return df.explain(optimized=optimized)
+    except BaseException as e:
+        return f'Cannot explain plan:\n{e}'
+
+
+def profile_table(df: pl.LazyFrame) -> tuple[pl.DataFrame, pl.DataFrame]:
+    result, timings = df.profile()
+    timings = timings.with_columns(
+        duration=pl.col('end') - pl.col('start')).sort('start')
+    return result, timings
+
+
+class PlanInspector(QtWidgets.QWidget):
+    def __init__(self, font, parent=None):
+        super().__init__(parent=parent)
+
+        self.node_name = None
+        self.df: pl.LazyFrame = None
+
+        self.setWindowTitle('Query Plan')
+        self.setWindowFlags(Qt.WindowType.Window)
+        self.setMinimumWidth(700)
+        self.setMinimumHeight(400)
+
+        # Widgets
+        self.unoptimized_edit = QtWidgets.QPlainTextEdit(readOnly=True)
+        self.unoptimized_edit.setFont(font)
+        self.unoptimized_edit.setLineWrapMode(
+            QtWidgets.QPlainTextEdit.NoWrap)
+
+        self.optimized_edit = QtWidgets.QPlainTextEdit(readOnly=True)
+        self.optimized_edit.setFont(font)
+        self.optimized_edit.setLineWrapMode(QtWidgets.QPlainTextEdit.NoWrap)
+
+        self.profile_tableau = TableauWithScroll()
+        self.profile_label = QtWidgets.QLabel()
+        self.profile_button = QtWidgets.QPushButton(
+            'Run profile', clicked=self.run_profile)
+
+        profile_widget = QtWidgets.QWidget()
+        profile_buttons_layout = QtWidgets.QHBoxLayout()
+        profile_buttons_layout.addWidget(self.profile_label)
+        profile_buttons_layout.addStretch()
+        profile_buttons_layout.addWidget(self.profile_button)
+        profile_layout = QtWidgets.QVBoxLayout(profile_widget)
+        profile_layout.setContentsMargins(0, 0, 0, 0)
+        profile_layout.addWidget(self.profile_tableau)
+        profile_layout.addLayout(profile_buttons_layout)
+
+        self.tabs = QtWidgets.QTabWidget()
+        self.tabs.addTab(self.unoptimized_edit, 'Plan')
+        self.tabs.addTab(self.optimized_edit, 'Optimized plan')
+        self.tabs.addTab(profile_widget, 'Profile')
+
+        # Layout
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.addWidget(self.tabs)
+
+    def set_table(self, node_name, df: pl.LazyFrame | None):
+        self.node_name = node_name
+        self.df = df
+        self.setWindowTitle(f'Query Plan - {node_name}')
+        self.profile_tableau.set_table(None)
+        self.profile_label.setText('')
+        self.profile_button.setEnabled(df is not None)
+        if df is None:
+            self.unoptimized_edit.setPlainText('No table')
+            self.optimized_edit.setPlainText('No table')
+            return
+        self.unoptimized_edit.setPlainText(get_plan(df, optimized=False))
+        self.optimized_edit.setPlainText(get_plan(df, optimized=True))
+
+    def run_profile(self):
+        if self.df is None:
+            return
+        self.profile_label.setText('computing...')
+        self.profile_button.setEnabled(False)
+        get_executor().submit(
+            f'{self.node_name} [profile]',
+            partial(profile_table, self.df),
+            partial(self.set_profile, self.df),
+            partial(self.set_profile_error, self.df))
+
+    def set_profile(self, df, result):
+        if df is not self.df:
+            return  # other node shown meanwhile
+        result, timings = result
+        self.profile_button.setEnabled(True)
+        total = timings['end'].max() if timings.height else 0
+        self.profile_label.setText(
+            f'{result.height} x {len(result.columns)} in {total}µs')
+        self.profile_tableau.set_table(timings)
+        self.profile_tableau.resize_columns_to_contents()
+
+    def set_profile_error(self, df, error):
+        if df is not self.df:
+            return
+        self.profile_button.setEnabled(True)
+        self.profile_label.setText(error.strip().split('\n')[-1])
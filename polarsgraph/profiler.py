@@ -0,0 +1,96 @@
+"""
+Record how long each node takes to build and to collect, and the size of its
+result, to find the slow nodes of a graph.
+
+Durations of nodes collected together (dashboards) are the duration of the
+whole batch.
+"""
+import json
+import time
+
+import polars as pl
+
+
+_profiles: dict[str, dict] = {}
+
+
+def _get_profile(node_name) -> dict:
+    return _profiles.setdefault(node_name, {})
+
+
+def record_build(node_name, duration):
+    _get_profile(node_name)['build_duration'] = duration
+
+
+def record_collect(node_name, duration, result, batch=None):
+    """
+    `result` is a DataFrame, or any table with `height`, `columns` and
+    `estimated_size()` (e.g. a PagedTable).
+    """
+    _get_profile(node_name).update(
+        collect_duration=duration,
+        batch=batch,
+        rows=result.height,
+        columns=len(result.columns),
+        estimated_size=result.estimated_size())
+
+
+def get_profile(node_name) -> dict | None:
+    return _profiles.get(node_name)
+
+
+def get_duration(profile: dict):
+    return (
+        (profile.get('build_duration') or 0) +
+        (profile.get('collect_duration') or 0))
+
+
+def get_max_duration(node_names):
+    durations = [
+        get_duration(_profiles[name]) for name in node_names
+        if name in _profiles]
+    return max(durations, default=0)
+
+
+def clear():
+    _profiles.clear()
+
+
+def export(path):
+    data = dict(
+        polars_version=pl.__version__,
+        datetime=time.strftime('%Y-%m-%dT%H:%M:%S'),
+        nodes=_profiles)
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=4)
+
+
+def format_duration(seconds):
+    if seconds < 1:
+        return f'{seconds * 1000:.0f}ms'
+    return f'{seconds:.2f}s'
+
+
+def format_count(count):
+    for unit in ('', 'k', 'M'):
+        if count < 1000:
+            return f'{count:.4g}{unit}'
+        count /= 1000
+    return f'{count:.4g}G'
+
+
+def format_size(size):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024:
+            return f'{size:.3g}{unit}'
+        size /= 1024
+    return f'{size:.3g}TB'
+
+
+def format_profile(profile: dict):
+    texts = [format_duration(get_duration(profile))]
+    if profile.get('rows') is not None:
+        rows = format_count(profile['rows'])
+        texts.append(f'{rows} x {profile["columns"]}')
+        texts.append(format_size(profile['estimated_size']))
+    return ' | '.join(texts)
@@ -77,6 +77,14 @@ def serialize_graph(graph, settings=None):
     return content
 
 
+def join_serialized_nodes(serialized_nodes: dict[str, str]):
+    """
+    Same as `serialize_graph` from already serialized nodes.
+    """
+    return ''.join(
+        f'{name}\n{text}\n' for name, text in serialized_nodes.items())
+
+
 def deserialize_graph(text):
     # Split text into nodes
     nodes = []
@@ -1,13 +1,17 @@
 """
-Brute force Undo stack holding the entire state of the document, not the
-modification steps.
+Undo stack holding the entire state of the document, not the modification
+steps.
+
+States can be dicts of serialized nodes: nodes unchanged since the previous
+state share the same string, so each state only costs its modified nodes.
 """
+from collections import deque
 
 
 class UndoStack():
     def __init__(self, max_size=300):
         self.max_size = max_size
-        self._stack = []
+        self._stack = deque(maxlen=max_size)
         self.index = 0
 
     @property
@@ -17,15 +21,13 @@ class UndoStack():
     def add(self, item):
         # Remove whatever was re-done
         while self.index:
-            self._stack.pop(0)
+            self._stack.popleft()
             self.index -= 1
 
-        # Add item
-        self._stack.insert(0, item)
-
-        # Remove old items
-        while self.size > self.max_size:
-            self._stack.pop()
+        # Add item (oldest items are dropped by the deque)
+        if self._stack:
+            item = share_unchanged(self._stack[0], item)
+        self._stack.appendleft(item)
 
     def undo(self):
         if not self._stack:
@@ -39,11 +41,43 @@ class UndoStack():
         self.index = max(0, self.index - 1)
         return self._stack[self.index]
 
+    def current(self):
+        """
+        Item matching the current state of the document.
+        """
+        if not self._stack:
+            return
+        return self._stack[self.index]
+
     def clear(self):
-        self._stack = []
+        self._stack.clear()
         self.index = 0
 
 
+def share_unchanged(previous, item):
+    """
+    Reuse the values of the previous state which didn't change.
+    """
+    if not isinstance(previous, dict) or not isinstance(item, dict):
+        return item
+    return {
+        key: previous[key] if previous.get(key) == value else value
+        for key, value in item.items()}
+
+
+def get_changes(state, other_state):
+    """
+    Return the keys (node names) added, removed and modified from `state` to
+    `other_state`.
+    """
+    added = [k for k in other_state if k not in state]
+    removed = [k for k in state if k not in other_state]
+    modified = [
+        k for k, v in other_state.items()
+        if k in state and state[k] is not v and state[k] != v]
+    return added, removed, modified
+
+
 if __name__ == '__main__':
     stack = UndoStack()
     stack.undo()
@@ -54,7 +88,7 @@ if __name__ == '__main__':
     assert stack.index == 0
     stack.add(3)
     stack.add(4)
-    assert stack._stack == [4, 3, 2, 1]
+    assert list(stack._stack) == [4, 3, 2, 1]
     assert stack.undo() == 3
     assert stack.undo() == 2
     assert stack.redo() == 3
@@ -66,4 +100,18 @@ if __name__ == '__main__':
     assert stack.undo() == 1
     assert stack.undo() == 1
     stack.add('a')
-    assert stack._stack == ['a', 1]
+    assert list(stack._stack) == ['a', 1]
+
+    # Max size
+    stack = UndoStack(max_size=2)
+    for i in range(5):
+        stack.add(i)
+    assert list(stack._stack) == [4, 3]
+
+    # Shared unchanged values
+    stack = UndoStack()
+    stack.add({'a': ''.join(['x', 'y']), 'b': 'z'})
+    stack.add({'a': ''.join(['x', 'y']), 'b': 'w', 'c': 'v'})
+    assert stack._stack[0]['a'] is stack._stack[1]['a']
+    assert get_changes(stack._stack[0], stack._stack[1]) == (
+        [], ['c'], ['b'])
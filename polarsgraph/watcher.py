@@ -0,0 +1,104 @@
+"""
+Watch the files read by the Load nodes, to refresh what depends on them when
+they are rewritten (e.g. monitoring CSVs exported every minute).
+
+Parent directories are watched too: files replaced by a rename are dropped
+by QFileSystemWatcher and must be watched again once they exist.
+"""
+import os
+
+from PySide6 import QtCore
+
+from polarsgraph.log import logger
+from polarsgraph.graph import LOAD_CATEGORY
+
+
+DEBOUNCE_DELAY = 300  # ms, files are often written in several steps
+
+
+def get_file_stat(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class SourcesWatcher(QtCore.QObject):
+    sources_changed = QtCore.Signal(list)  # names of the nodes to refresh
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+
+        self.graph = {}
+        self.nodes_by_path: dict[str, set[str]] = {}
+        self.stats: dict[str, tuple] = {}
+        self.changed_paths = set()
+
+        self.watcher = QtCore.QFileSystemWatcher(self)
+        self.watcher.fileChanged.connect(self._path_changed)
+        self.watcher.directoryChanged.connect(self._directory_changed)
+
+        self.timer = QtCore.QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(DEBOUNCE_DELAY)
+        self.timer.timeout.connect(self._emit_changes)
+
+    def set_graph(self, graph):
+        self.graph = graph
+        self.update_paths()
+
+    def update_paths(self):
+        """
+        Follow the sources of the Load nodes currently in the graph.
+        """
+        nodes_by_path = {}
+        for node in self.graph.values():
+            if node.category != LOAD_CATEGORY:
+                continue
+            for path in node.get_source_paths() or []:
+                path = os.path.abspath(path)
+                nodes_by_path.setdefault(path, set()).add(node['name'])
+        self.nodes_by_path = nodes_by_path
+
+        paths = set(nodes_by_path)
+        directories = {os.path.dirname(path) for path in paths}
+        watched = set(self.watcher.files()) | set(self.watcher.directories())
+        obsolete = watched - paths - directories
+        if obsolete:
+            self.watcher.removePaths(list(obsolete))
+        for path in (paths | directories) - watched:
+            if os.path.exists(path):
+                self.watcher.addPath(path)
+        for path in paths:
+            if path not in self.stats:
+                self.stats[path] = get_file_stat(path)
+        self.stats = {path: self.stats[path] for path in paths}
+
+    def _path_changed(self, path):
+        self.changed_paths.add(path)
+        self.timer.start()
+
+    def _directory_changed(self, directory):
+        watched = set(self.watcher.files())
+        for path in self.nodes_by_path:
+            if os.path.dirname(path) == directory and path not in watched:
+                self._path_changed(path)  # file replaced or created
+
+    def _emit_changes(self):
+        node_names = set()
+        watched = set(self.watcher.files())
+        for path in self.changed_paths:
+            if path not in self.nodes_by_path:
+                continue
+            if path not in watched and os.path.exists(path):
+                self.watcher.addPath(path)
+            stat = get_file_stat(path)
+            if stat == self.stats.get(path):
+                continue  # touched but not modified
+            self.stats[path] = stat
+            logger.debug(f'Source changed: {path}')
+            node_names.update(self.nodes_by_path[path])
+        self.changed_paths.clear()
+        if node_names:
+            self.sources_changed.emit(sorted(node_names))